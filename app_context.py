@@ -0,0 +1,135 @@
+import importlib
+import threading
+import time
+
+import yaml
+
+
+class AppContext:
+    """
+    Conteneur des services partagés : la config, les bases et les clients réseau sont construits une seule fois,
+    au premier accès, puis passés à chaque composant par son constructeur.
+    Le temps de construction de chaque service est gardé dans timings.
+    """
+
+    def __init__(self, config_path="config.yaml", config=None):
+        self.config_path = config_path
+        self._services = {}
+        self._lock = threading.RLock()
+        self.timings = {}
+        if config is not None:
+            self._services["config"] = config
+
+    def _get(self, name, module_name, class_name, build=None):
+        with self._lock:
+            if name not in self._services:
+                # l'import du module est compté dans le temps de construction (torch, whisper...)
+                start = time.perf_counter()
+                cls = getattr(importlib.import_module(module_name), class_name)
+                self._services[name] = build(cls) if build else cls()
+                self.timings[name] = time.perf_counter() - start
+            return self._services[name]
+
+    @property
+    def config(self):
+        with self._lock:
+            if "config" not in self._services:
+                start = time.perf_counter()
+                with open(self.config_path, encoding="utf-8") as f:
+                    self._services["config"] = yaml.safe_load(f)
+                self.timings["config"] = time.perf_counter() - start
+            return self._services["config"]
+
+    # bases de données
+
+    @property
+    def story_db(self):
+        return self._get("story_db", "databases.story_database", "StoryDatabase")
+
+    @property
+    def image_db(self):
+        return self._get("image_db", "databases.image_database", "ImageDatabase")
+
+    @property
+    def character_db(self):
+        return self._get("character_db", "databases.personnage_database", "PersonnageDatabase")
+
+    @property
+    def media_index(self):
+        return self._get("media_index", "databases.media_index_database", "MediaIndexDatabase")
+
+    # clients réseau
+
+    @property
+    def llm_client(self):
+        return self._get("llm_client", "llm_client", "LLMClient", lambda cls: cls(self.config_path, self.config))
+
+    @property
+    def leonardo(self):
+        return self._get(
+            "leonardo", "leonardo_client", "LeonardoClient", lambda cls: cls(self.config_path, self.config, self.image_db)
+        )
+
+    # composants du pipeline
+
+    @property
+    def story_builder(self):
+        return self._get(
+            "story_builder", "story_builder", "StoryBuilder", lambda cls: cls(self.config_path, self.config, self.llm_client)
+        )
+
+    @property
+    def story_image_generator(self):
+        return self._get(
+            "story_image_generator",
+            "story_image_generator",
+            "StoryImageGenerator",
+            lambda cls: cls(self.config_path, self.config, self.llm_client, self.leonardo, self.story_db, self.image_db),
+        )
+
+    @property
+    def story_processor(self):
+        return self._get(
+            "story_processor",
+            "story_processor",
+            "StoryProcessor",
+            lambda cls: cls(
+                self.config_path,
+                self.config,
+                self.llm_client,
+                self.story_image_generator,
+                self.story_builder,
+                self.story_db,
+                self.character_db,
+            ),
+        )
+
+    @property
+    def voice_generator(self):
+        return self._get(
+            "voice_generator", "voice_generator", "VoiceGenerator", lambda cls: cls(self.config_path, self.config, self.story_db)
+        )
+
+    @property
+    def subtitle_generator(self):
+        return self._get(
+            "subtitle_generator",
+            "subtitle_generator",
+            "SubtitleGenerator",
+            lambda cls: cls(config=self.config, story_db=self.story_db),
+        )
+
+    @property
+    def video_story_builder(self):
+        return self._get(
+            "video_story_builder",
+            "video_story_builder",
+            "VideoStoryBuilder",
+            lambda cls: cls(self.config_path, self.config, self.story_db, self.subtitle_generator, self.media_index),
+        )
+
+    def print_timings(self):
+        # temps cumulés : un service inclut la construction de ses dépendances créées au même moment
+        print("\n⏱️ Construction des services :")
+        for name, elapsed in sorted(self.timings.items(), key=lambda item: item[1], reverse=True):
+            print(f"   {elapsed * 1000:8.1f} ms  {name}")
@@ -0,0 +1,90 @@
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from word_alignment import WordAligner  # noqa: E402
+
+
+def synthetic_part(n_words, rng):
+    # texte de référence + une "transcription" bruitée : mots oubliés, déformés et ajoutés
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyzéè") for _ in range(rng.randint(1, 9))) for _ in range(2000)]
+    ref = [rng.choice(vocab) for _ in range(n_words)]
+    heard, truth = [], []
+    for idx, word in enumerate(ref):
+        draw = rng.random()
+        if draw < 0.05:
+            continue
+        heard.append(word[:-1] + "x" if draw < 0.12 and len(word) > 2 else word)
+        truth.append(idx)
+        if rng.random() < 0.03:
+            heard.append("euh")
+            truth.append(None)
+    return heard, ref, truth
+
+
+def run_benchmark(sizes):
+    aligner = WordAligner()
+    rng = random.Random(0)
+    for size in sizes:
+        heard, ref, truth = synthetic_part(size, rng)
+        start = time.perf_counter()
+        alignment = aligner.align(heard, ref)
+        elapsed = time.perf_counter() - start
+        accuracy = sum(ref_idx == expected for (ref_idx, _), expected in zip(alignment, truth)) / len(truth)
+        print(f"  {size:>6} mots : {elapsed * 1000:8.1f} ms ({len(heard) / elapsed:,.0f} mots/s), précision {accuracy:.1%}")
+
+
+def run_corpus(root, min_agreement):
+    """
+    Ré-aligne les transcriptions déjà produites (*_word_by_word.json) et compare le résultat
+    au mot corrigé enregistré. Le texte de référence est reconstitué depuis le {epc}.json voisin.
+    """
+    aligner = WordAligner()
+    regressions = 0
+    files = sorted(glob.glob(os.path.join(root, "**", "*_word_by_word.json"), recursive=True))
+    for path in files:
+        segments_path = path.replace("_word_by_word.json", ".json")
+        if not os.path.exists(segments_path):
+            continue
+        with open(path, encoding="utf-8") as f:
+            words = json.load(f)
+        with open(segments_path, encoding="utf-8") as f:
+            segments = json.load(f)
+        if not words:
+            continue
+
+        ref_words = re.findall(r"\w+", " ".join(seg["text"] for seg in segments))
+        heard = [w.get("original_text", w["text"]) for w in words]
+        alignment = aligner.align(heard, ref_words)
+        agreement = sum(
+            ref_idx is not None and ref_words[ref_idx].lower() == w["text"].lower() for (ref_idx, _), w in zip(alignment, words)
+        ) / len(words)
+
+        flag = "✅" if agreement >= min_agreement else "❌"
+        regressions += agreement < min_agreement
+        print(f"  {flag} {agreement:6.1%}  {path}")
+
+    print(f"\n{len(files)} fichier(s), {regressions} sous le seuil de {min_agreement:.0%}")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark et corpus de non-régression de l'alignement mot à mot.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000, 20000])
+    parser.add_argument("--corpus", help="dossier contenant des *_word_by_word.json (ex: histoire/)")
+    parser.add_argument("--min-agreement", type=float, default=0.95)
+    args = parser.parse_args()
+
+    print("⏱️ Alignement sur des parties synthétiques :")
+    run_benchmark(args.sizes)
+
+    if args.corpus:
+        print(f"\n📚 Corpus de non-régression : {args.corpus}")
+        sys.exit(1 if run_corpus(args.corpus, args.min_agreement) else 0)
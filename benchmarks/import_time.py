@@ -0,0 +1,73 @@
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules lourds qu'une action n'a pas le droit d'importer si elle ne s'en sert pas
+HEAVY_MODULES = ("torch", "TTS", "faster_whisper", "cv2", "moviepy", "numpy")
+
+# ce que chaque action construit avant de faire son premier appel réseau / disque
+ACTIONS = {
+    "import": ("import magic_story", HEAVY_MODULES),
+    "write": (
+        "import magic_story; m = magic_story.MagicStory(); m.story_builder; m.story_processor; "
+        "m.story_image_generator; m.story_database",
+        HEAVY_MODULES,
+    ),
+    "voice": ("import magic_story; m = magic_story.MagicStory(); m.voice_generator", ("faster_whisper", "cv2", "moviepy")),
+}
+
+
+def measure(code):
+    """
+    Lance `python -X importtime -c code` dans un process neuf et retourne {module: (temps cumulé en µs, premier niveau)}.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, capture_output=True, text=True, check=False
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise RuntimeError(f"❌ Échec de : {code}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        name = name[1:]
+        # l'indentation (2 espaces par niveau) indique l'import parent ; le total ne compte que le premier niveau
+        timings[name.strip()] = (int(cumulative), not name.startswith(" "))
+    return timings
+
+
+def run(actions, max_ms, top):
+    failed = False
+    for action in actions:
+        code, forbidden = ACTIONS[action]
+        timings = measure(code)
+        total_ms = sum(cumulative for cumulative, top_level in timings.values() if top_level) / 1000
+        heavy = sorted({name.split(".")[0] for name in timings} & set(forbidden))
+
+        print(f"\n⏱️ {action} : {total_ms:.0f} ms d'imports ({len(timings)} modules)")
+        slowest = sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:top]
+        for name, (cumulative, _) in slowest:
+            print(f"   {cumulative / 1000:8.1f} ms  {name}")
+
+        if heavy:
+            failed = True
+            print(f"❌ Modules lourds importés par '{action}' : {', '.join(heavy)}")
+        if max_ms and total_ms > max_ms:
+            failed = True
+            print(f"❌ '{action}' dépasse le budget de {max_ms} ms")
+    return failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import au démarrage de magic_story.py (garde-fou de régression).")
+    parser.add_argument("actions", nargs="*", choices=sorted(ACTIONS), default=["import", "write"])
+    parser.add_argument("--max-ms", type=float, default=0, help="budget total d'import par action (0 = pas de limite)")
+    parser.add_argument("--top", type=int, default=10, help="nombre de modules les plus lents à afficher")
+    args = parser.parse_args()
+    sys.exit(1 if run(args.actions, args.max_ms, args.top) else 0)
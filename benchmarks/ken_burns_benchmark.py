@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ken_burns import MOVES, KenBurnsMotion  # noqa: E402
+
+
+def run(image, duration, fps, batch_sizes):
+    print(f"🖼️ Image {image.shape[1]}x{image.shape[0]} — {duration}s à {fps} fps")
+    for batch_size in batch_sizes:
+        motion = KenBurnsMotion(image, batch_size=batch_size, max_speed_px_per_sec=75)
+        for move in MOVES:
+            start = time.perf_counter()
+            count = sum(1 for _ in motion.frames(duration, fps, move=move))
+            elapsed = time.perf_counter() - start
+            print(f"  batch={batch_size:<3} {move:<10} {count / elapsed:8.1f} images/s ({count} images en {elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark du générateur Ken Burns.")
+    parser.add_argument("image", nargs="?", help="image source (sinon image aléatoire 1024x768)")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--fps", type=int, default=24)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 24])
+    args = parser.parse_args()
+
+    if args.image:
+        import cv2
+
+        source = cv2.imread(args.image)
+    else:
+        source = np.random.default_rng(0).integers(0, 256, (768, 1024, 3), dtype=np.uint8)
+
+    run(source, args.duration, args.fps, args.batch_sizes)
@@ -0,0 +1,63 @@
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from databases.connection import close_connections  # noqa: E402
+from databases.story_database import StoryDatabase  # noqa: E402
+
+
+class FreshConnectionStoryDatabase(StoryDatabase):
+    # comportement d'origine : une nouvelle connexion par appel, journal rollback par défaut
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+
+def scenario(db, title, parts):
+    """
+    Cycle de vie d'une histoire : insertion des pages, prompts, lectures, temps de lecture. Retourne {étape: (ops, s)}.
+    """
+    timings = {}
+
+    def step(name, count, fn):
+        start = time.perf_counter()
+        fn()
+        timings[name] = (count, time.perf_counter() - start)
+
+    texts = [f"Page {idx} : il était une fois une histoire de {idx} mots." for idx in range(parts)]
+    step("add_or_update_story", parts, lambda: [db.add_or_update_story(title, text) for text in texts])
+    epcs = [part["epc"] for part in db.get_story_parts(title)]
+    step("update_prompts", parts, lambda: [db.update_prompts(epc, "prompt", "negative") for epc in epcs])
+    step("get_story_parts", parts, lambda: [db.get_story_parts(title) for _ in range(parts)])
+    step("update_reading_time", parts, lambda: [db.update_reading_time(epc, 42) for epc in epcs])
+    return timings
+
+
+def run(parts):
+    with tempfile.TemporaryDirectory(prefix="sqlite_bench_") as folder:
+        results = {}
+        for label, cls in (("avant", FreshConnectionStoryDatabase), ("après", StoryDatabase)):
+            db = cls(os.path.join(folder, f"{label}.db"))
+            # les méthodes affichent une ligne par opération : on les fait taire pendant la mesure
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[label] = scenario(db, "histoire de test", parts)
+        close_connections()
+
+    print(f"\n🗄️ Histoire de {parts} parties (ops/s)")
+    print(f"  {'opération':<22} {'avant':>10} {'après':>10} {'gain':>7}")
+    for name, (count, before) in results["avant"].items():
+        after = results["après"][name][1]
+        print(f"  {name:<22} {count / before:>10.0f} {count / after:>10.0f} {before / after:>6.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la couche SQLite (connexion par appel vs WAL partagée).")
+    parser.add_argument("--parts", type=int, default=300)
+    args = parser.parse_args()
+    run(args.parts)
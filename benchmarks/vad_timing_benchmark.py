@@ -0,0 +1,60 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from subtitle_generator import SubtitleGenerator  # noqa: E402
+from vad_timing import VadSubtitleTimer  # noqa: E402
+
+
+def compare(title, voice_dir):
+    """
+    Compare le minutage VAD aux sorties Whisper déjà présentes ({epc}_word_by_word.json avec ref_index).
+    """
+    jobs = SubtitleGenerator().collect_whisper_jobs(title, voice_dir)
+    timer = VadSubtitleTimer()
+    errors, elapsed, audio_sec = [], 0.0, 0.0
+
+    for job in jobs:
+        whisper_path = job["json_path"].replace(".json", "_word_by_word.json")
+        if not os.path.exists(whisper_path):
+            print(f"⏭️ Pas de référence Whisper pour {job['epc']}")
+            continue
+        with open(whisper_path, encoding="utf-8") as f:
+            whisper_words = {w["ref_index"]: w for w in json.load(f) if "ref_index" in w}
+
+        start = time.perf_counter()
+        vad_words = timer.time_words(job["wav_path"], job["reference_text"])
+        elapsed += time.perf_counter() - start
+        audio_sec += vad_words[-1]["end"] if vad_words else 0.0
+
+        part_errors = [
+            abs(w["start"] - whisper_words[w["ref_index"]]["start"]) for w in vad_words if w["ref_index"] in whisper_words
+        ]
+        errors += part_errors
+        if part_errors:
+            print(f"  {job['epc']:<50} écart médian {np.median(part_errors) * 1000:6.0f} ms")
+
+    if not errors:
+        print("❌ Aucun mot comparable.")
+        return
+
+    errors = np.array(errors)
+    print(f"\n⚡ VAD : {elapsed * 1000:.1f} ms pour {audio_sec:.0f} s d'audio ({len(jobs)} parties)")
+    print(f"🎯 Écart sur le début des mots vs Whisper ({len(errors)} mots) :")
+    median_ms, mean_ms, p90_ms = np.median(errors) * 1000, errors.mean() * 1000, np.percentile(errors, 90) * 1000
+    print(f"   médian {median_ms:.0f} ms, moyen {mean_ms:.0f} ms, p90 {p90_ms:.0f} ms")
+    print(f"   < 250 ms : {np.mean(errors < 0.25):.1%}, < 500 ms : {np.mean(errors < 0.5):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark et précision du minutage VAD contre Whisper.")
+    parser.add_argument("title", help="titre de l'histoire en base")
+    parser.add_argument("voice_dir", help="dossier voice/ de l'histoire (WAV + JSON Whisper)")
+    args = parser.parse_args()
+    compare(args.title, args.voice_dir)
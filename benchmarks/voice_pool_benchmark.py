@@ -0,0 +1,57 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from voice_worker_pool import VoiceWorkerPool  # noqa: E402
+
+SAMPLE_TEXT = (
+    "Il était une fois une petite coccinelle qui rêvait de voir la mer. "
+    "Chaque matin, elle grimpait tout en haut du grand chêne pour regarder l'horizon. "
+    "Un jour, le vent se leva et l'emporta bien plus loin qu'elle ne l'avait jamais imaginé."
+)
+
+
+def run(worker_counts, parts, personnage, config_path):
+    """
+    Synthétise les mêmes parties avec chaque taille de pool et affiche le real-time factor
+    (temps écoulé / durée d'audio produite), chargement des modèles compris.
+    """
+    rows = []
+    for workers in worker_counts:
+        with tempfile.TemporaryDirectory(prefix="voice_bench_") as folder:
+            jobs = [
+                {
+                    "story": "benchmark",
+                    "epc": f"part_{idx}",
+                    "text": SAMPLE_TEXT,
+                    "personnage": personnage,
+                    "output_path": os.path.join(folder, f"part_{idx}.wav"),
+                }
+                for idx in range(parts)
+            ]
+            start = time.perf_counter()
+            results = VoiceWorkerPool(workers, config_path).run(jobs)
+            wall = time.perf_counter() - start
+
+        audio_sec = sum(result["audio_sec"] for result in results)
+        compute_rtf = sum(VoiceWorkerPool.rtf(result) for result in results) / len(results)
+        rows.append((workers, wall, audio_sec, wall / audio_sec, compute_rtf))
+
+    print(f"\n🎙️ {parts} parties, voix {personnage}, {os.cpu_count()} coeurs")
+    print(f"  {'workers':>7} {'temps':>8} {'audio':>8} {'RTF global':>11} {'RTF/partie':>11}")
+    for workers, wall, audio_sec, rtf, compute_rtf in rows:
+        print(f"  {workers:>7} {wall:>7.1f}s {audio_sec:>7.1f}s {rtf:>11.2f} {compute_rtf:>11.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Real-time factor de la synthèse vocale selon la taille du pool.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--parts", type=int, default=8)
+    parser.add_argument("--voice", default="nathan", help="voix dans assets/voices/personnages/")
+    parser.add_argument("--config", default="config.yaml")
+    args = parser.parse_args()
+    run(args.workers, args.parts, args.voice, args.config)
@@ -0,0 +1,19 @@
+import hashlib
+import json
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def text_sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def params_sha256(params):
+    # json trié pour que l'ordre des clés ne change pas le hash
+    return text_sha256(json.dumps(params, sort_keys=True, ensure_ascii=False))
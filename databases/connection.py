@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import threading
+
+# une connexion par (process, thread, fichier) : sqlite3 n'autorise pas le partage d'une connexion entre threads,
+# et une connexion héritée d'un fork ne doit jamais être réutilisée par le process enfant
+_local = threading.local()
+
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA foreign_keys = ON",
+    "PRAGMA busy_timeout = 30000",
+)
+
+
+def _open(db_path, cached_statements):
+    conn = sqlite3.connect(db_path, timeout=30, cached_statements=cached_statements)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def get_connection(db_path, cached_statements=256):
+    """
+    Connexion réutilisable pour ce thread et ce process, en mode WAL.
+    À utiliser avec `with conn:` pour délimiter une transaction (commit ou rollback), sans la fermer.
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        _local.pid = os.getpid()
+        _local.connections = {}
+
+    key = os.path.abspath(db_path)
+    conn = _local.connections.get(key)
+    if conn is None:
+        conn = _local.connections[key] = _open(db_path, cached_statements)
+    return conn
+
+
+def close_connections():
+    # ferme les connexions du thread courant (fin d'un worker, tests)
+    if getattr(_local, "pid", None) != os.getpid():
+        return
+    for conn in _local.connections.values():
+        conn.close()
+    _local.connections = {}
@@ -1,37 +1,19 @@
-import os
 import sqlite3
 
+from databases.connection import get_connection
+from databases.schema import DEFAULT_DB_PATH, ensure_schema
+
 
 class ImageDatabase:
     def __init__(self, db_path=None):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = db_path or os.path.join(base_dir, "images.db")
+        self.db_path = db_path or DEFAULT_DB_PATH
         self._create_table()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _create_table(self):
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS images (
-                    epc TEXT PRIMARY KEY,
-                    width INTEGER,
-                    height INTEGER,
-                    inference_steps INTEGER,
-                    prompt_magic BOOLEAN,
-                    alchemy_mode BOOLEAN,
-                    high_resolution BOOLEAN,
-                    is_custom_model BOOLEAN,
-                    is_sdxl BOOLEAN,
-                    autres_parametres TEXT,
-                    prompt TEXT,
-                    negative_prompt TEXT,
-                    model_id TEXT,
-                    preset_style TEXT
-                )
-            """)
+        ensure_schema(self._connect(), self.db_path)
         # print("✅ Base de données des images créée ou déjà existante.")
 
     def add_entry(
@@ -75,8 +57,10 @@ class ImageDatabase:
                 fields.append(field)
                 values.append(value)
 
-        placeholders = ", ".join(["?"] * len(fields))
-        fields_sql = ", ".join(fields)
+        # rattachement à la partie par sa clé (NULL si la partie n'existe pas en base)
+        placeholders = ", ".join(["?"] * len(fields) + ["(SELECT id FROM histoires WHERE epc = ?)"])
+        fields_sql = ", ".join(fields + ["part_id"])
+        values.append(epc)
 
         try:
             with self._connect() as conn:
@@ -128,6 +112,7 @@ class ImageDatabase:
             "negative_prompt",
             "model_id",
             "preset_style",
+            "part_id",
         ]
 
         print("\n🖼️  Entrée trouvée :")
@@ -143,10 +128,11 @@ class ImageDatabase:
             return cursor.fetchone() is not None
 
     def search_by_title(self, title):
-        search_pattern = f"{title.lower().replace(' ', '_')}%"
+        # intervalle [préfixe, préfixe + U+10FFFF) : utilise la clé primaire, contrairement à LIKE 'préfixe%'
+        prefix = title.lower().replace(" ", "_")
         with self._connect() as conn:
             cursor = conn.cursor()
-            cursor.execute("SELECT epc FROM images WHERE epc LIKE ?", (search_pattern,))
+            cursor.execute("SELECT epc FROM images WHERE epc >= ? AND epc < ? ORDER BY epc", (prefix, prefix + "\U0010ffff"))
             rows = cursor.fetchall()
 
         epcs = [row[0] for row in rows]
@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import struct
+import wave
+
+from content_hash import file_sha256
+from databases.connection import get_connection
+from media_headers import AUDIO_EXTENSIONS, IMAGE_EXTENSIONS, read_media_header
+
+MEDIA_EXTENSIONS = AUDIO_EXTENSIONS | IMAGE_EXTENSIONS
+# ordre de préférence quand une même partie a plusieurs images
+IMAGE_PREFERENCE = (".png", ".jpg", ".jpeg")
+
+
+class MediaIndexDatabase:
+    """
+    Index des fichiers audio / image des histoires : taille, mtime, hash, durée, fréquence, dimensions.
+    Les métadonnées viennent des en-têtes seulement et ne sont relues que si la taille ou le mtime changent.
+    """
+
+    def __init__(self, db_path=None):
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        self.db_path = db_path or os.path.join(base_dir, "media_index.db")
+        self._create_table()
+
+    def _connect(self):
+        return get_connection(self.db_path)
+
+    def _create_table(self):
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS media (
+                    path TEXT PRIMARY KEY,
+                    folder TEXT NOT NULL,
+                    stem TEXT NOT NULL,
+                    extension TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    duration REAL,
+                    sample_rate INTEGER,
+                    channels INTEGER,
+                    width INTEGER,
+                    height INTEGER
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_media_folder ON media (folder, stem)")
+
+    def _index_row(self, path, stat):
+        header = read_media_header(path)
+        stem, extension = os.path.splitext(os.path.basename(path))
+        return (
+            path,
+            os.path.dirname(path),
+            stem,
+            extension.lower(),
+            header["kind"],
+            stat.st_size,
+            stat.st_mtime_ns,
+            file_sha256(path),
+            header.get("duration"),
+            header.get("sample_rate"),
+            header.get("channels"),
+            header.get("width"),
+            header.get("height"),
+        )
+
+    def _upsert_rows(self, conn, rows):
+        conn.executemany("INSERT OR REPLACE INTO media VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def refresh(self, root):
+        """
+        Met l'index à jour pour tous les médias sous root (fichiers nouveaux, modifiés ou supprimés), en une transaction.
+        """
+        root = os.path.abspath(root)
+        with self._connect() as conn:
+            known = {
+                path: (size, mtime_ns)
+                for path, size, mtime_ns in conn.execute(
+                    # intervalle sur la clé primaire plutôt que LIKE 'root/%', qui parcourt toute la table
+                    "SELECT path, size, mtime_ns FROM media WHERE path = ? OR (path >= ? AND path < ?)",
+                    (root, root + os.sep, root + os.sep + "\U0010ffff"),
+                )
+            }
+
+            rows = []
+            seen = set()
+            for folder, _, files in os.walk(root):
+                for name in files:
+                    if os.path.splitext(name)[1].lower() not in MEDIA_EXTENSIONS:
+                        continue
+                    path = os.path.join(folder, name)
+                    stat = os.stat(path)
+                    if known.get(path) == (stat.st_size, stat.st_mtime_ns):
+                        seen.add(path)
+                        continue
+                    try:
+                        rows.append(self._index_row(path, stat))
+                        seen.add(path)
+                    except (OSError, ValueError, EOFError, struct.error, wave.Error) as e:
+                        # une ancienne entrée pour ce fichier sera retirée
+                        print(f"⚠️ En-tête illisible, fichier ignoré : {path} ({e})")
+
+            removed = [(path,) for path in known if path not in seen]
+            self._upsert_rows(conn, rows)
+            conn.executemany("DELETE FROM media WHERE path = ?", removed)
+
+        if rows or removed:
+            print(f"🗂️ Index médias : {len(rows)} fichiers (ré)indexés, {len(removed)} retirés ({root})")
+        return len(rows), len(removed)
+
+    def get(self, path):
+        """
+        Métadonnées d'un fichier (un seul stat pour vérifier la fraîcheur), ou None s'il n'existe pas ou n'est pas un média.
+        """
+        path = os.path.abspath(path)
+        if os.path.splitext(path)[1].lower() not in MEDIA_EXTENSIONS:
+            return None
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            row = cursor.execute("SELECT * FROM media WHERE path = ?", (path,)).fetchone()
+            if row is None or (row["size"], row["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                self._upsert_rows(conn, [self._index_row(path, stat)])
+                row = cursor.execute("SELECT * FROM media WHERE path = ?", (path,)).fetchone()
+        return dict(row)
+
+    def sha256(self, path):
+        # hash déjà calculé pour les médias indexés, calculé à la volée pour les autres fichiers
+        entry = self.get(path)
+        return entry["sha256"] if entry else file_sha256(path)
+
+    def duration(self, path):
+        entry = self.get(path)
+        return entry["duration"] if entry else None
+
+    def folder_entries(self, folder, kind):
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            rows = cursor.execute("SELECT * FROM media WHERE folder = ? AND kind = ?", (os.path.abspath(folder), kind)).fetchall()
+        return [dict(row) for row in rows]
+
+    def images_by_stem(self, folder):
+        # {epc: chemin de l'image}, le .png est préféré au .jpg comme avant
+        images = {}
+        for entry in sorted(self.folder_entries(folder, "image"), key=lambda e: IMAGE_PREFERENCE.index(e["extension"])):
+            images.setdefault(entry["stem"], entry["path"])
+        return images
+
+    def audio_by_stem(self, folder):
+        return {entry["stem"]: entry for entry in self.folder_entries(folder, "audio")}
@@ -0,0 +1,132 @@
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from databases.connection import close_connections, get_connection  # noqa: E402
+from databases.schema import (  # noqa: E402
+    DEFAULT_DB_PATH,
+    ensure_schema,
+    has_content,
+    legacy_files,
+    legacy_migrated,
+    mark_legacy_migrated,
+    normalize_title,
+)
+from databases.story_database import text_hash  # noqa: E402
+
+LEGACY_FILES = legacy_files(os.path.dirname(os.path.abspath(__file__)))
+
+
+def migrate_legacy(target=DEFAULT_DB_PATH, legacy_files=LEGACY_FILES):
+    """
+    Copie histoires.db, personnages.db et images.db dans la base unique, en une transaction qui pose aussi
+    le drapeau legacy_migrated : la migration n'est jamais rejouée, même si les anciennes bases étaient vides.
+    Les id sont conservés (les epc en dépendent) ; les anciens fichiers ne sont pas modifiés.
+    Retourne {table: nombre de lignes copiées}.
+    """
+    conn = get_connection(target)
+    ensure_schema(conn)
+
+    attached = {alias: path for alias, path in legacy_files.items() if os.path.exists(path)}
+    if not attached:
+        print("⚠️ Aucune ancienne base trouvée, rien à migrer.")
+        return {}
+
+    conn.create_function("normalize_title", 1, normalize_title, deterministic=True)
+    conn.create_function("text_hash", 1, text_hash, deterministic=True)
+    for alias, path in attached.items():
+        conn.execute(f"ATTACH DATABASE ? AS {alias}", (path,))
+
+    try:
+        # un ancien fichier sans sa table (base jamais initialisée) n'a rien à migrer
+        present = {
+            alias
+            for alias in attached
+            if conn.execute(
+                f"SELECT 1 FROM {alias}.sqlite_master WHERE type = 'table' AND name = ?", (alias.removeprefix("legacy_"),)
+            ).fetchone()
+        }
+
+        # BEGIN IMMEDIATE : si plusieurs process démarrent ensemble, un seul migre, les autres voient le drapeau
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if legacy_migrated(conn):
+                raise RuntimeError(f"❌ Les anciennes bases ont déjà été migrées dans {target}")
+            if has_content(conn):
+                raise RuntimeError(f"❌ La base {target} contient déjà des histoires ou des images : migration annulée")
+
+            titles = []
+            if "legacy_histoires" in present:
+                titles.append("SELECT titre FROM legacy_histoires.histoires")
+            if "legacy_personnages" in present:
+                titles.append("SELECT titre FROM legacy_personnages.personnages")
+            if titles:
+                conn.execute(
+                    f"INSERT INTO stories (titre, slug) SELECT titre, normalize_title(titre) FROM ({' UNION '.join(titles)})"
+                )
+
+            if "legacy_histoires" in present:
+                conn.execute("""
+                    INSERT INTO histoires (id, story_id, titre, text_part, text_hash, text_with_description,
+                                           image_prompt, negative_prompt, temps_lecture_sec, epc)
+                    SELECT h.id, s.id, h.titre, h.text_part, text_hash(h.text_part), h.text_with_description,
+                           h.image_prompt, h.negative_prompt, h.temps_lecture_sec, h.epc
+                    FROM legacy_histoires.histoires h JOIN stories s ON s.titre = h.titre
+                """)
+
+            if "legacy_personnages" in present:
+                conn.execute("""
+                    INSERT INTO personnages (id, story_id, titre, noms, description)
+                    SELECT p.id, s.id, p.titre, p.noms, p.description
+                    FROM legacy_personnages.personnages p JOIN stories s ON s.titre = p.titre
+                """)
+
+            if "legacy_images" in present:
+                # une image sans partie connue est gardée, sans rattachement (part_id NULL)
+                conn.execute("""
+                    INSERT INTO images (epc, width, height, inference_steps, prompt_magic, alchemy_mode, high_resolution,
+                                        is_custom_model, is_sdxl, autres_parametres, prompt, negative_prompt, model_id,
+                                        preset_style, part_id)
+                    SELECT i.epc, i.width, i.height, i.inference_steps, i.prompt_magic, i.alchemy_mode, i.high_resolution,
+                           i.is_custom_model, i.is_sdxl, i.autres_parametres, i.prompt, i.negative_prompt, i.model_id,
+                           i.preset_style, h.id
+                    FROM legacy_images.images i LEFT JOIN histoires h ON h.epc = i.epc
+                """)
+            mark_legacy_migrated(conn)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        tables = ("stories", "histoires", "personnages", "images")
+        counts = {table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in tables}
+        orphans = conn.execute("SELECT COUNT(*) FROM images WHERE part_id IS NULL").fetchone()[0]
+    finally:
+        for alias in attached:
+            conn.execute(f"DETACH DATABASE {alias}")
+
+    print(f"✅ Migration vers {target} : " + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    if orphans:
+        print(f"⚠️ {orphans} image(s) sans partie correspondante (part_id NULL)")
+    return counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration unique des anciennes bases vers la base commune des histoires.")
+    parser.add_argument("--target", default=DEFAULT_DB_PATH)
+    parser.add_argument("--histoires", default=LEGACY_FILES["legacy_histoires"])
+    parser.add_argument("--personnages", default=LEGACY_FILES["legacy_personnages"])
+    parser.add_argument("--images", default=LEGACY_FILES["legacy_images"])
+    args = parser.parse_args()
+    try:
+        migrate_legacy(
+            args.target,
+            {"legacy_histoires": args.histoires, "legacy_personnages": args.personnages, "legacy_images": args.images},
+        )
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+    finally:
+        close_connections()
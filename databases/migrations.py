@@ -0,0 +1,35 @@
+import sqlite3
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn: sqlite3.Connection, migrations) -> int:
+    """
+    Applique les migrations manquantes, dans l'ordre. La version du schéma est gardée dans PRAGMA user_version :
+    la migration n°1 amène la base en version 1, etc. Une étape est une requête SQL ou une fonction (conn).
+    Chaque migration est appliquée dans sa propre transaction, avec la nouvelle version.
+    """
+    if schema_version(conn) >= len(migrations):
+        return schema_version(conn)
+
+    for version, steps in enumerate(migrations, start=1):
+        # BEGIN IMMEDIATE : un seul process migre, les autres attendent puis relisent la version
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        print(f"🛠️ Migration {version} appliquée")
+    return schema_version(conn)
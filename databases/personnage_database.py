@@ -1,29 +1,20 @@
 import json
-import os
 import sqlite3
 
+from databases.connection import get_connection
+from databases.schema import DEFAULT_DB_PATH, ensure_schema, ensure_story
+
 
 class PersonnageDatabase:
     def __init__(self, db_path=None):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = db_path or os.path.join(base_dir, "personnages.db")
+        self.db_path = db_path or DEFAULT_DB_PATH
         self._create_table()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     def _create_table(self):
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS personnages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    titre TEXT NOT NULL,
-                    noms TEXT NOT NULL,  -- liste JSON
-                    description TEXT NOT NULL,
-                    UNIQUE(titre, noms)
-                )
-            """)
+        ensure_schema(self._connect(), self.db_path)
         # print("✅ Table 'personnages' prête.")
 
     def add_or_update(self, titre: str, noms: list[str], description: str):
@@ -51,17 +42,31 @@ class PersonnageDatabase:
             else:
                 cursor.execute(
                     """
-                    INSERT INTO personnages (titre, noms, description)
-                    VALUES (?, ?, ?)
+                    INSERT INTO personnages (story_id, titre, noms, description)
+                    VALUES (?, ?, ?, ?)
                 """,
-                    (titre, noms_json, description),
+                    (ensure_story(conn, titre), titre, noms_json, description),
                 )
                 print(f"✅ Nouveau personnage ajouté : {noms} ({titre})")
 
+    def upsert_characters(self, titre: str, personnages: list[tuple[list[str], str]]):
+        # [(noms, description), ...] en une seule transaction, la contrainte UNIQUE(titre, noms) sert de clé
+        with self._connect() as conn:
+            story_id = ensure_story(conn, titre)
+            conn.executemany(
+                """
+                INSERT INTO personnages (story_id, titre, noms, description)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(titre, noms) DO UPDATE SET description = excluded.description
+            """,
+                [(story_id, titre, json.dumps(noms, ensure_ascii=False), description) for noms, description in personnages],
+            )
+        print(f"👥 {len(personnages)} personnage(s) enregistrés pour : {titre}")
+
     def get_by_title(self, titre: str) -> list[dict]:
         with self._connect() as conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute(
                 """
                 SELECT * FROM personnages WHERE titre = ? ORDER BY noms
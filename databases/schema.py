@@ -0,0 +1,133 @@
+import os
+
+from databases.migrations import migrate
+
+# un seul fichier pour les histoires, leurs parties, personnages et images : les jointures remplacent les allers-retours
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "magic_story.db")
+
+# version n = MIGRATIONS[n - 1], cf. databases/migrations.py
+MIGRATIONS = (
+    (
+        """
+        CREATE TABLE IF NOT EXISTS stories (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            titre TEXT NOT NULL UNIQUE,
+            slug TEXT NOT NULL
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS histoires (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL REFERENCES stories(id) ON DELETE CASCADE,
+            titre TEXT NOT NULL,
+            text_part TEXT NOT NULL,
+            text_hash TEXT,
+            text_with_description TEXT,
+            image_prompt TEXT,
+            negative_prompt TEXT,
+            temps_lecture_sec INTEGER,
+            epc TEXT UNIQUE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_histoires_story ON histoires(story_id)",
+        "CREATE INDEX IF NOT EXISTS idx_histoires_titre ON histoires(titre)",
+        "CREATE INDEX IF NOT EXISTS idx_histoires_text_hash ON histoires(text_hash)",
+        """
+        CREATE TABLE IF NOT EXISTS personnages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            story_id INTEGER NOT NULL REFERENCES stories(id) ON DELETE CASCADE,
+            titre TEXT NOT NULL,
+            noms TEXT NOT NULL,  -- liste JSON
+            description TEXT NOT NULL,
+            UNIQUE(titre, noms)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_personnages_story ON personnages(story_id)",
+        """
+        CREATE TABLE IF NOT EXISTS images (
+            epc TEXT PRIMARY KEY,
+            width INTEGER,
+            height INTEGER,
+            inference_steps INTEGER,
+            prompt_magic BOOLEAN,
+            alchemy_mode BOOLEAN,
+            high_resolution BOOLEAN,
+            is_custom_model BOOLEAN,
+            is_sdxl BOOLEAN,
+            autres_parametres TEXT,
+            prompt TEXT,
+            negative_prompt TEXT,
+            model_id TEXT,
+            preset_style TEXT,
+            part_id INTEGER REFERENCES histoires(id) ON DELETE CASCADE
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_images_part ON images(part_id)",
+    ),
+    (
+        "CREATE TABLE IF NOT EXISTS meta (cle TEXT PRIMARY KEY, valeur TEXT)",
+        # base déjà migrée avant l'ajout du drapeau : des histoires ou des images suffisent à le savoir
+        """
+        INSERT INTO meta (cle, valeur) SELECT 'legacy_migrated', '1'
+        WHERE EXISTS (SELECT 1 FROM stories) OR EXISTS (SELECT 1 FROM images)
+        """,
+    ),
+)
+# posé par databases/migrate_legacy.py dans la transaction de la migration
+LEGACY_MIGRATED = "legacy_migrated"
+
+
+def normalize_title(titre: str) -> str:
+    return titre.strip().replace(" ", "_").replace("’", "").replace("'", "").lower()
+
+
+# anciennes bases (une par table), reprises par databases/migrate_legacy.py
+LEGACY_FILE_NAMES = {
+    "legacy_histoires": "histoires.db",
+    "legacy_personnages": "personnages.db",
+    "legacy_images": "images.db",
+}
+
+
+def legacy_files(folder):
+    return {alias: os.path.join(folder, name) for alias, name in LEGACY_FILE_NAMES.items()}
+
+
+def legacy_migrated(conn):
+    return conn.execute("SELECT 1 FROM meta WHERE cle = ?", (LEGACY_MIGRATED,)).fetchone() is not None
+
+
+def mark_legacy_migrated(conn):
+    conn.execute("INSERT INTO meta (cle, valeur) VALUES (?, '1') ON CONFLICT(cle) DO NOTHING", (LEGACY_MIGRATED,))
+
+
+def has_content(conn):
+    return bool(conn.execute("SELECT EXISTS (SELECT 1 FROM stories) OR EXISTS (SELECT 1 FROM images)").fetchone()[0])
+
+
+def ensure_schema(conn, db_path=None):
+    """
+    Applique le schéma. Si db_path est donné, que d'anciennes bases existent à côté et qu'elles n'ont jamais été
+    migrées dans une base encore vide, elles sont migrées d'abord : sinon le pipeline repartirait de zéro
+    (appels LLM et images Leonardo payants refaits).
+    """
+    version = migrate(conn, MIGRATIONS)
+    if db_path is None:
+        return version
+
+    old_files = legacy_files(os.path.dirname(os.path.abspath(db_path)))
+    if any(os.path.exists(path) for path in old_files.values()) and not legacy_migrated(conn) and not has_content(conn):
+        from databases.migrate_legacy import migrate_legacy
+
+        print(f"🛠️ Anciennes bases détectées à côté de {db_path} : migration automatique")
+        try:
+            migrate_legacy(db_path, old_files)
+        except RuntimeError:
+            pass  # un autre process vient de faire la migration
+    return version
+
+
+def ensure_story(conn, titre: str) -> int:
+    # crée la ligne de l'histoire au premier enregistrement d'une partie ou d'un personnage
+    conn.execute("INSERT INTO stories (titre, slug) VALUES (?, ?) ON CONFLICT(titre) DO NOTHING", (titre, normalize_title(titre)))
+    return conn.execute("SELECT id FROM stories WHERE titre = ?", (titre,)).fetchone()[0]
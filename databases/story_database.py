@@ -1,19 +1,26 @@
-import os
+import hashlib
 import sqlite3
 
+from databases.connection import get_connection
+from databases.schema import DEFAULT_DB_PATH, ensure_schema, ensure_story, normalize_title
+
+
+def text_hash(text_part: str) -> str:
+    # empreinte du texte : la recherche (titre, text_part) passe par un index au lieu de comparer des pages entières
+    return hashlib.sha1(text_part.encode("utf-8")).hexdigest()
+
 
 class StoryDatabase:
     def __init__(self, db_path: str | None = None):
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        self.db_path = db_path or os.path.join(base_dir, "histoires.db")
+        self.db_path = db_path or DEFAULT_DB_PATH
         self._create_table()
 
     def _connect(self):
-        return sqlite3.connect(self.db_path)
+        return get_connection(self.db_path)
 
     @staticmethod
     def _normalize_title(titre: str) -> str:
-        return titre.strip().replace(" ", "_").replace("’", "").replace("'", "").lower()
+        return normalize_title(titre)
 
     @staticmethod
     def _reading_time(nb_mots: int, mots_par_minute: int = 130) -> int:
@@ -27,20 +34,8 @@ class StoryDatabase:
         return total_secondes
 
     def _create_table(self):
-        with self._connect() as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS histoires (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    titre TEXT NOT NULL,
-                    text_part TEXT NOT NULL,
-                    text_with_description TEXT,
-                    image_prompt TEXT,
-                    negative_prompt TEXT,
-                    temps_lecture_sec INTEGER,
-                    epc TEXT UNIQUE
-                )
-            """)
+        # schéma commun aux parties, personnages et images, cf. databases/schema.py
+        ensure_schema(self._connect(), self.db_path)
         # print("✅ Base de données des histoires créée (ou déjà existante).")
 
     def add_or_update_story(self, titre: str, text_part: str, text_with_description: str | None = None, epc: str | None = None):
@@ -49,6 +44,7 @@ class StoryDatabase:
 
         with self._connect() as conn:
             cursor = conn.cursor()
+            story_id = ensure_story(conn, titre)
 
             if epc:
                 cursor.execute("SELECT id FROM histoires WHERE epc = ?", (epc,))
@@ -58,23 +54,28 @@ class StoryDatabase:
                     cursor.execute(
                         """
                         UPDATE histoires
-                        SET titre = ?, text_part = ?, text_with_description = ?, temps_lecture_sec = ?
+                        SET story_id = ?, titre = ?, text_part = ?, text_hash = ?,
+                            text_with_description = ?, temps_lecture_sec = ?
                         WHERE id = ?
                     """,
-                        (titre, text_part, text_with_description, temps_sec, result[0]),
+                        (story_id, titre, text_part, text_hash(text_part), text_with_description, temps_sec, result[0]),
                     )
                     print(f"🔁 Histoire mise à jour via epc : {epc}")
                 else:
                     cursor.execute(
                         """
-                        INSERT INTO histoires (titre, text_part, text_with_description, temps_lecture_sec, epc)
-                        VALUES (?, ?, ?, ?, ?)
+                        INSERT INTO histoires
+                            (story_id, titre, text_part, text_hash, text_with_description, temps_lecture_sec, epc)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
                     """,
-                        (titre, text_part, text_with_description, temps_sec, epc),
+                        (story_id, titre, text_part, text_hash(text_part), text_with_description, temps_sec, epc),
                     )
                     print(f"⚠️ epc fourni mais introuvable, nouvelle entrée créée avec epc : {epc}")
             else:
-                cursor.execute("SELECT id, epc FROM histoires WHERE titre = ? AND text_part = ?", (titre, text_part))
+                cursor.execute(
+                    "SELECT id, epc FROM histoires WHERE text_hash = ? AND titre = ? AND text_part = ?",
+                    (text_hash(text_part), titre, text_part),
+                )
                 result = cursor.fetchone()
 
                 if result:
@@ -90,16 +91,92 @@ class StoryDatabase:
                 else:
                     cursor.execute(
                         """
-                        INSERT INTO histoires (titre, text_part, text_with_description, temps_lecture_sec)
-                        VALUES (?, ?, ?, ?)
+                        INSERT INTO histoires (story_id, titre, text_part, text_hash, text_with_description, temps_lecture_sec)
+                        VALUES (?, ?, ?, ?, ?, ?)
                     """,
-                        (titre, text_part, text_with_description, temps_sec),
+                        (story_id, titre, text_part, text_hash(text_part), text_with_description, temps_sec),
                     )
                     last_id = cursor.lastrowid
                     epc_generated = f"{titre_normalise}_{last_id}"
                     cursor.execute("UPDATE histoires SET epc = ? WHERE id = ?", (epc_generated, last_id))
                     print(f"✅ Nouvelle histoire insérée avec epc : {epc_generated}")
 
+    def upsert_parts(self, titre: str, parts: list[dict]):
+        """
+        Insère ou met à jour toutes les parties d'une histoire en une seule transaction.
+        Chaque partie : {"text_part", "text_with_description" (optionnel), "epc" (optionnel)}.
+        Avec epc : upsert sur l'epc. Sans epc : mise à jour si (titre, text_part) existe déjà, sinon insertion
+        puis génération de l'epc à partir de l'id, comme add_or_update_story.
+        """
+        titre_normalise = self._normalize_title(titre)
+        with_epc, without_epc = [], []
+        for part in parts:
+            text_part = part["text_part"]
+            row = (
+                titre,
+                text_part,
+                text_hash(text_part),
+                part.get("text_with_description"),
+                self._reading_time(len(text_part.split())),
+            )
+            if part.get("epc"):
+                with_epc.append((*row, part["epc"]))
+            else:
+                without_epc.append(row)
+
+        # une même page répétée dans le lot n'est insérée qu'une fois (la dernière version gagne),
+        # comme avec des appels successifs à add_or_update_story
+        without_epc = list({row[1]: row for row in without_epc}.values())
+
+        with self._connect() as conn:
+            story_id = ensure_story(conn, titre)
+            conn.executemany(
+                """
+                INSERT INTO histoires (story_id, titre, text_part, text_hash, text_with_description, temps_lecture_sec, epc)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(epc) DO UPDATE SET
+                    story_id = excluded.story_id,
+                    titre = excluded.titre,
+                    text_part = excluded.text_part,
+                    text_hash = excluded.text_hash,
+                    text_with_description = excluded.text_with_description,
+                    temps_lecture_sec = excluded.temps_lecture_sec
+            """,
+                [(story_id, *row) for row in with_epc],
+            )
+
+            # pas de contrainte d'unicité sur (titre, text_part) : on sépare mises à jour et insertions en une lecture
+            existing = dict(conn.execute("SELECT text_part, id FROM histoires WHERE titre = ?", (titre,)).fetchall())
+            conn.executemany(
+                "UPDATE histoires SET text_with_description = ?, temps_lecture_sec = ? WHERE id = ?",
+                [(desc, temps_sec, existing[text]) for _, text, _, desc, temps_sec in without_epc if text in existing],
+            )
+            new_rows = [row for row in without_epc if row[1] not in existing]
+            conn.executemany(
+                """
+                INSERT INTO histoires (story_id, titre, text_part, text_hash, text_with_description, temps_lecture_sec)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                [(story_id, *row) for row in new_rows],
+            )
+            conn.execute("UPDATE histoires SET epc = ? || '_' || id WHERE titre = ? AND epc IS NULL", (titre_normalise, titre))
+
+        print(f"✅ {len(parts)} parties enregistrées pour « {titre} » ({len(new_rows)} nouvelles)")
+
+    def update_prompts_many(self, prompts: list[tuple[str, str, str]]):
+        # [(epc, image_prompt, negative_prompt), ...] en une seule transaction
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE histoires SET image_prompt = ?, negative_prompt = ? WHERE epc = ?",
+                [(image_prompt, negative_prompt, epc) for epc, image_prompt, negative_prompt in prompts],
+            )
+            updated = conn.total_changes - before
+
+        print(f"🎨 Prompts mis à jour pour {updated}/{len(prompts)} parties")
+        if updated < len(prompts):
+            print("❌ Certaines parties sont introuvables en base")
+
     def update_prompts(self, epc: str, image_prompt: str, negative_prompt: str):
         with self._connect() as conn:
             cursor = conn.cursor()
@@ -150,8 +227,8 @@ class StoryDatabase:
 
     def get_story_parts(self, titre: str, afficher=False) -> list[dict]:
         with self._connect() as conn:
-            conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
             cursor.execute("SELECT * FROM histoires WHERE titre = ? ORDER BY id", (titre,))
             rows = cursor.fetchall()
 
@@ -167,6 +244,51 @@ class StoryDatabase:
 
         return results
 
+    def parts_without_image(self, titre: str) -> list[dict]:
+        # une seule requête au lieu d'un exists() par partie ; jointure sur l'epc comme exists(), pour compter
+        # aussi les images enregistrées sans rattachement (part_id NULL)
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(
+                """
+                SELECT h.* FROM stories s
+                JOIN histoires h ON h.story_id = s.id
+                LEFT JOIN images i ON i.epc = h.epc
+                WHERE s.titre = ? AND i.epc IS NULL
+                ORDER BY h.id
+            """,
+                (titre,),
+            )
+            return [dict(row) for row in cursor.fetchall()]
+
+    def story_progress(self, titre: str) -> dict | None:
+        """
+        Avancement d'une histoire en une requête : nombre de parties, de descriptions, de prompts, d'images et de personnages.
+        """
+        with self._connect() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
+            cursor.execute(
+                """
+                SELECT
+                    s.titre,
+                    COUNT(h.id) AS parties,
+                    COUNT(h.text_with_description) AS descriptions,
+                    COUNT(h.image_prompt) AS prompts,
+                    COUNT(i.epc) AS images,
+                    (SELECT COUNT(*) FROM personnages p WHERE p.story_id = s.id) AS personnages
+                FROM stories s
+                LEFT JOIN histoires h ON h.story_id = s.id
+                LEFT JOIN images i ON i.epc = h.epc
+                WHERE s.titre = ?
+                GROUP BY s.id
+            """,
+                (titre,),
+            )
+            row = cursor.fetchone()
+        return dict(row) if row else None
+
     def update_reading_time(self, epc: str, temps_sec: int):
         with self._connect() as conn:
             cursor = conn.cursor()
@@ -185,3 +307,17 @@ class StoryDatabase:
                 print(f"⏱️ Temps de lecture mis à jour pour epc '{epc}' : {temps_sec} secondes")
             else:
                 print(f"❌ Aucune histoire trouvée avec epc : {epc}")
+
+    def update_reading_times(self, temps_par_epc: list[tuple[str, int]]):
+        # une seule transaction pour toutes les parties
+        with self._connect() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "UPDATE histoires SET temps_lecture_sec = ? WHERE epc = ?",
+                [(temps_sec, epc) for epc, temps_sec in temps_par_epc],
+            )
+            updated = conn.total_changes - before
+
+        print(f"⏱️ Temps de lecture mis à jour pour {updated}/{len(temps_par_epc)} parties")
+        if updated < len(temps_par_epc):
+            print("❌ Certaines parties sont introuvables en base")
@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+
+
+class DiskCache:
+    """
+    Cache clé → fichier sur disque, borné en taille, avec éviction LRU
+    (la date de modification d'une entrée est rafraîchie à chaque lecture).
+    """
+
+    def __init__(self, root, max_bytes, suffix=".json"):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key):
+        # deux niveaux de dossiers pour ne pas avoir des milliers de fichiers au même endroit
+        return os.path.join(self.root, key[:2], f"{key}{self.suffix}")
+
+    def contains(self, key):
+        return os.path.exists(self._path(key))
+
+    def get_bytes(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        os.utime(path)
+        return data
+
+    def put_bytes(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def get_json(self, key):
+        data = self.get_bytes(key)
+        return json.loads(data) if data is not None else None
+
+    def put_json(self, key, value):
+        self.put_bytes(key, json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+    def evict(self):
+        entries = []
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                if name.endswith(self.suffix):
+                    path = os.path.join(folder, name)
+                    stat = os.stat(path)
+                    entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
@@ -0,0 +1,298 @@
+import json
+import os
+import subprocess
+import tempfile
+from collections import Counter
+
+
+class FFmpegRenderer:
+    def __init__(self, fps=24, crf=20, preset="medium", audio_bitrate="192k", threads=None):
+        self.fps = fps
+        self.crf = crf
+        self.preset = preset
+        self.audio_bitrate = audio_bitrate
+        self.threads = threads
+
+    @staticmethod
+    def _escape_filter_path(path):
+        # ffmpeg filtergraph : il faut échapper \ : et ' dans les chemins
+        return path.replace("\\", "/").replace(":", r"\:").replace("'", r"\'")
+
+    def _video_codec_args(self):
+        args = ["-c:v", "libx264", "-preset", self.preset, "-crf", str(self.crf), "-pix_fmt", "yuv420p"]
+        if self.threads:
+            args += ["-threads", str(self.threads)]
+        return args
+
+    def render_part(self, frames, size, audio_path, output_path, frame_count, ass_path=None, black_gap=1.0, fade=1.0):
+        """
+        Encode une partie en une seule passe : les images du pan/zoom arrivent en brut sur stdin,
+        ffmpeg ajoute l'audio, les fondus, le noir de fin et les sous-titres puis encode en libx264.
+        """
+        width, height = size
+        clip_duration = frame_count / self.fps
+        total_duration = clip_duration + black_gap
+
+        video_filters = [
+            f"fade=t=in:st=0:d={fade}",
+            f"fade=t=out:st={max(clip_duration - fade, 0):.3f}:d={fade}",
+        ]
+        if black_gap > 0:
+            video_filters.append(f"tpad=stop_mode=add:stop_duration={black_gap}:color=black")
+        if ass_path:
+            video_filters.append(f"ass=filename='{self._escape_filter_path(ass_path)}'")
+        video_filters.append("format=yuv420p")
+
+        filter_complex = f"[0:v]{','.join(video_filters)}[v];[1:a]apad=whole_dur={total_duration:.3f}[a]"
+
+        command = [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-f",
+            "rawvideo",
+            "-pix_fmt",
+            "bgr24",
+            "-s",
+            f"{width}x{height}",
+            "-r",
+            str(self.fps),
+            "-i",
+            "pipe:0",
+            "-i",
+            audio_path,
+            "-filter_complex",
+            filter_complex,
+            "-map",
+            "[v]",
+            "-map",
+            "[a]",
+            *self._video_codec_args(),
+            "-r",
+            str(self.fps),
+            "-c:a",
+            "aac",
+            "-b:a",
+            self.audio_bitrate,
+            "-t",
+            f"{total_duration:.3f}",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+
+        # on écrit dans un fichier temporaire pour ne jamais laisser une partie à moitié encodée
+        tmp_output = f"{os.path.splitext(output_path)[0]}.part.mp4"
+        command[-1] = tmp_output
+
+        process = subprocess.Popen(command, stdin=subprocess.PIPE)
+        try:
+            for frame in frames:
+                # les images sont des vues contiguës sur un buffer réutilisé : pas de copie
+                process.stdin.write(frame.data)
+        except BrokenPipeError:
+            pass
+        finally:
+            process.stdin.close()
+            return_code = process.wait()
+
+        if return_code != 0:
+            if os.path.exists(tmp_output):
+                os.remove(tmp_output)
+            raise RuntimeError(f"❌ ffmpeg a échoué ({return_code}) pour : {output_path}")
+
+        os.replace(tmp_output, output_path)
+        print(f"✅ Partie encodée en une passe : {output_path}")
+
+    def probe(self, path):
+        command = ["ffprobe", "-v", "error", "-show_streams", "-show_format", "-of", "json", path]
+        result = subprocess.run(command, check=True, capture_output=True, text=True)
+        return json.loads(result.stdout)
+
+    def duration(self, path):
+        return float(self.probe(path)["format"]["duration"])
+
+    def stream_signature(self, path):
+        info = self.probe(path)
+        video = next((st for st in info.get("streams", []) if st.get("codec_type") == "video"), {})
+        audio = next((st for st in info.get("streams", []) if st.get("codec_type") == "audio"), {})
+        # tout ce qui doit être identique pour que le demuxer concat puisse copier les flux
+        return (
+            video.get("codec_name"),
+            video.get("profile"),
+            video.get("width"),
+            video.get("height"),
+            video.get("pix_fmt"),
+            video.get("r_frame_rate"),
+            audio.get("codec_name"),
+            audio.get("sample_rate"),
+            audio.get("channels"),
+        )
+
+    def normalize_part(self, input_path, output_path, signature, has_audio=True):
+        _, _, width, height, pix_fmt, frame_rate, _, sample_rate, channels = signature
+
+        command = ["ffmpeg", "-y", "-loglevel", "error", "-i", input_path]
+        if not has_audio:
+            command += ["-f", "lavfi", "-i", f"anullsrc=r={sample_rate or 44100}:cl={'mono' if channels == 1 else 'stereo'}"]
+        command += [
+            "-map",
+            "0:v:0",
+            "-map",
+            "0:a:0" if has_audio else "1:a:0",
+            "-vf",
+            f"scale={width}:{height},fps={frame_rate},format={pix_fmt}",
+            *self._video_codec_args(),
+            "-c:a",
+            "aac",
+            "-b:a",
+            self.audio_bitrate,
+        ]
+        if sample_rate:
+            command += ["-ar", str(sample_rate)]
+        if channels:
+            command += ["-ac", str(channels)]
+        if not has_audio:
+            command += ["-shortest"]
+        command.append(output_path)
+        subprocess.run(command, check=True)
+
+    def concat_copy(self, paths, output_path):
+        """
+        Concatène les parties avec le demuxer concat de ffmpeg, sans ré-encodage.
+        Seules les parties dont les paramètres diffèrent de la majorité sont ré-encodées avant.
+        """
+        signatures = [self.stream_signature(path) for path in paths]
+        reference = Counter(signatures).most_common(1)[0][0]
+
+        with tempfile.TemporaryDirectory(prefix="concat_") as scratch:
+            inputs = []
+            for idx, (path, signature) in enumerate(zip(paths, signatures)):
+                if signature != reference:
+                    print(f"🔧 Paramètres différents, ré-encodage de : {path}")
+                    normalized = os.path.join(scratch, f"{idx}.mp4")
+                    self.normalize_part(path, normalized, reference, has_audio=signature[6] is not None)
+                    path = normalized
+                inputs.append(os.path.abspath(path))
+
+            list_path = os.path.join(scratch, "parts.txt")
+            with open(list_path, "w", encoding="utf-8") as f:
+                for path in inputs:
+                    escaped = path.replace("'", "'\\''")
+                    f.write(f"file '{escaped}'\n")
+
+            command = [
+                "ffmpeg",
+                "-y",
+                "-loglevel",
+                "error",
+                "-f",
+                "concat",
+                "-safe",
+                "0",
+                "-i",
+                list_path,
+                "-c",
+                "copy",
+                "-movflags",
+                "+faststart",
+                output_path,
+            ]
+            subprocess.run(command, check=True)
+
+    def mix_music(self, video_path, music_path, output_path, music_volume=0.16):
+        """
+        Mixe la narration avec la musique bouclée et atténuée ; seul l'audio est ré-encodé,
+        les flux vidéo et sous-titres sont copiés tels quels.
+        """
+        filter_complex = (
+            f"[1:a]volume={music_volume}[music];[0:a][music]amix=inputs=2:duration=first:dropout_transition=0:normalize=0[a]"
+        )
+        command = [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            video_path,
+            "-stream_loop",
+            "-1",
+            "-i",
+            music_path,
+            "-filter_complex",
+            filter_complex,
+            "-map",
+            "0:v",
+            "-map",
+            "[a]",
+            "-map",
+            "0:s?",
+            "-c:v",
+            "copy",
+            "-c:s",
+            "copy",
+            "-c:a",
+            "aac",
+            "-b:a",
+            self.audio_bitrate,
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+        subprocess.run(command, check=True)
+
+    def burn_subtitles(self, video_path, ass_path, output_path):
+        """
+        Incruste la piste ASS de toute l'histoire en un seul encodage, l'audio est copié.
+        """
+        command = [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            video_path,
+            "-vf",
+            f"ass=filename='{self._escape_filter_path(ass_path)}',format=yuv420p",
+            *self._video_codec_args(),
+            "-c:a",
+            "copy",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+        subprocess.run(command, check=True)
+
+    def mux_subtitles(self, video_path, srt_path, output_path, language="fre"):
+        """
+        Ajoute la piste SRT comme sous-titres activables (mov_text), sans ré-encoder la vidéo ni l'audio.
+        """
+        command = [
+            "ffmpeg",
+            "-y",
+            "-loglevel",
+            "error",
+            "-i",
+            video_path,
+            "-i",
+            srt_path,
+            "-map",
+            "0:v",
+            "-map",
+            "0:a?",
+            "-map",
+            "1:0",
+            "-c:v",
+            "copy",
+            "-c:a",
+            "copy",
+            "-c:s",
+            "mov_text",
+            "-metadata:s:s:0",
+            f"language={language}",
+            "-movflags",
+            "+faststart",
+            output_path,
+        ]
+        subprocess.run(command, check=True)
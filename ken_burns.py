@@ -0,0 +1,107 @@
+import random
+
+import cv2
+import numpy as np
+
+PAN_MOVES = ("pan_up", "pan_down", "pan_left", "pan_right")
+ZOOM_MOVES = ("zoom_in", "zoom_out")
+MOVES = PAN_MOVES + ZOOM_MOVES
+
+
+def _ease(t, easing):
+    if easing == "linear":
+        return t
+    if easing == "ease_in_out":
+        return 0.5 - 0.5 * np.cos(np.pi * t)
+    raise ValueError(f"Courbe d'accélération inconnue : {easing}")
+
+
+class KenBurnsMotion:
+    """
+    Effet Ken Burns calculé directement depuis l'image source : une transformation affine par image
+    (échelle + translation en sous-pixel), rendue par lots dans des buffers réutilisés.
+    """
+
+    def __init__(self, image, zoom_factor=1.5, easing="ease_in_out", batch_size=24, max_speed_px_per_sec=None):
+        self.image = cv2.imread(image) if isinstance(image, str) else image
+        if self.image is None:
+            raise ValueError(f"❌ Image illisible : {image}")
+        self.height, self.width = self.image.shape[:2]
+        self.zoom_factor = zoom_factor
+        self.easing = easing
+        self.batch_size = batch_size
+        self.max_speed_px_per_sec = max_speed_px_per_sec
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def choose_move(self, seed=None, moves=MOVES):
+        return random.Random(seed).choice(list(moves))
+
+    def plan(self, duration, fps, move):
+        """
+        Retourne les matrices affines (n, 2, 3) qui envoient l'image source vers chaque image de sortie.
+        """
+        total_frames = int(duration * fps)
+        t = _ease(np.linspace(0.0, 1.0, total_frames, dtype=np.float64), self.easing)
+        w, h, z = self.width, self.height, self.zoom_factor
+
+        if move in PAN_MOVES:
+            # fenêtre de taille (w/z, h/z) qui traverse l'image, zoom constant
+            scale = np.full(total_frames, z)
+            span_x, span_y = w - w / z, h - h / z
+            start, end = {
+                "pan_up": ((span_x / 2, span_y), (span_x / 2, 0.0)),
+                "pan_down": ((span_x / 2, 0.0), (span_x / 2, span_y)),
+                "pan_left": ((span_x, span_y / 2), (0.0, span_y / 2)),
+                "pan_right": ((0.0, span_y / 2), (span_x, span_y / 2)),
+            }[move]
+            start, end = np.array(start), np.array(end)
+
+            # limite de vitesse exprimée en pixels de sortie, comme pour l'ancien pan
+            if self.max_speed_px_per_sec is not None:
+                distance = np.linalg.norm(end - start) * z
+                max_distance = self.max_speed_px_per_sec * duration
+                if distance > max_distance:
+                    end = start + (end - start) * (max_distance / distance)
+
+            x0 = start[0] + (end[0] - start[0]) * t
+            y0 = start[1] + (end[1] - start[1]) * t
+        elif move in ZOOM_MOVES:
+            z_start, z_end = (1.0, z) if move == "zoom_in" else (z, 1.0)
+            scale = z_start + (z_end - z_start) * t
+            # zoom centré : la fenêtre reste au milieu de l'image
+            x0 = (w - w / scale) / 2
+            y0 = (h - h / scale) / 2
+        else:
+            raise ValueError(f"Mouvement inconnu : {move}")
+
+        matrices = np.zeros((total_frames, 2, 3), dtype=np.float64)
+        matrices[:, 0, 0] = scale
+        matrices[:, 1, 1] = scale
+        matrices[:, 0, 2] = -scale * x0
+        matrices[:, 1, 2] = -scale * y0
+        return matrices
+
+    def frames(self, duration, fps, move=None, seed=None, moves=MOVES):
+        """
+        Générateur d'images BGR. Les tableaux renvoyés sont des vues sur un buffer réutilisé :
+        il faut les consommer (ou les copier) avant de demander l'image suivante du lot d'après.
+        """
+        move = move or self.choose_move(seed, moves)
+        matrices = self.plan(duration, fps, move)
+        buffers = np.empty((self.batch_size, self.height, self.width, 3), dtype=self.image.dtype)
+
+        for batch_start in range(0, len(matrices), self.batch_size):
+            batch = matrices[batch_start : batch_start + self.batch_size]
+            for i, matrix in enumerate(batch):
+                cv2.warpAffine(
+                    self.image,
+                    matrix,
+                    (self.width, self.height),
+                    dst=buffers[i],
+                    flags=cv2.INTER_LINEAR,
+                    borderMode=cv2.BORDER_REFLECT,
+                )
+            yield from buffers[: len(batch)]
@@ -7,12 +7,12 @@ from dotenv import load_dotenv
 
 
 class LeonardoClient:
-    def __init__(self, config_path="config.yaml"):
+    def __init__(self, config_path="config.yaml", config=None, image_db=None):
         load_dotenv()
         self.token = os.getenv("LEONARDO_API_KEY")
         self.headers = {"accept": "application/json", "content-type": "application/json", "authorization": f"Bearer {self.token}"}
 
-        self.image_db = ImageDatabase()
+        self.image_db = image_db or ImageDatabase()
 
         self.url_generate = "https://cloud.leonardo.ai/api/rest/v1/generations"
         self.url_me = "https://cloud.leonardo.ai/api/rest/v1/me"
@@ -21,7 +21,7 @@ class LeonardoClient:
 
         self.global_story_folder = "histoire/"
 
-        self.config = self._load_config(config_path)
+        self.config = config if config is not None else self._load_config(config_path)
 
         self.width = 1024
         self.height = 768
@@ -9,7 +9,7 @@ from openai import OpenAI
 
 
 class LLMClient:
-    def __init__(self, config_path="config.yaml"):
+    def __init__(self, config_path="config.yaml", config=None):
         load_dotenv()
         self.endpoint = "https://models.inference.ai.azure.com"
         self.token = os.getenv("GITHUB_TOKEN")
@@ -20,7 +20,7 @@ class LLMClient:
         self.headers_mistral = {"Content-Type": "application/json", "api-key": self.token}
 
         self.url_mistral = f"{self.endpoint}/chat/completions?api-version=2023-12-01-preview"
-        self.config = self._load_config(config_path)
+        self.config = config if config is not None else self._load_config(config_path)
 
     def _load_config(self, path):
         if not os.path.exists(path):
@@ -3,29 +3,48 @@ import json
 import os
 import random
 
-import yaml
-from databases.story_database import StoryDatabase
-from story_builder import StoryBuilder
-from story_image_generator import StoryImageGenerator
-from story_processor import StoryProcessor
-from video_story_builder import VideoStoryBuilder
-from voice_generator import VoiceGenerator
+from app_context import AppContext
+from voice_worker_pool import VoiceWorkerPool
 
 
 class MagicStory:
-    def __init__(self, config_path="config.yaml"):
-        self.story_builder = StoryBuilder()
-        self.story_processor = StoryProcessor()
-        self.story_image_generator = StoryImageGenerator()
-        self.voice_generator = VoiceGenerator()
-        self.video_story_builder = VideoStoryBuilder()
-        self.story_database = StoryDatabase()
+    """
+    Chaque composant (et ses dépendances lourdes : torch, coqui, whisper, opencv, moviepy...)
+    n'est importé et construit qu'au premier accès, via le contexte partagé, pour que chaque action
+    ne paie que ce qu'elle utilise.
+    """
 
-        with open(config_path, encoding="utf-8") as f:
-            self.config = yaml.safe_load(f)
+    def __init__(self, config_path="config.yaml", context=None):
+        self.config_path = config_path
+        self.context = context or AppContext(config_path)
+        self.config = self.context.config
 
         self.global_folder = self.config["base_story_dir"]
 
+    @property
+    def story_builder(self):
+        return self.context.story_builder
+
+    @property
+    def story_processor(self):
+        return self.context.story_processor
+
+    @property
+    def story_image_generator(self):
+        return self.context.story_image_generator
+
+    @property
+    def voice_generator(self):
+        return self.context.voice_generator
+
+    @property
+    def video_story_builder(self):
+        return self.context.video_story_builder
+
+    @property
+    def story_database(self):
+        return self.context.story_db
+
     def demander_nom_dossier(self):
         while True:
             nom_dossier = input("Entrez le nom du dossier : ").strip()
@@ -97,10 +116,17 @@ class MagicStory:
 
         # personnage = random.choice(["nathan", "elisa"])
         personnage = self.config.get("voice", "nathan")
-        for story in story_list:
-            if not story.get("voice"):
-                self.voice_generator.create_voices_for_story(story["nom_dossier"], story["titre"], personnage)
-                story["voice"] = True
+        pending = [story for story in story_list if not story.get("voice")]
+        # toutes les parties de toutes les histoires en attente passent dans la même file
+        jobs = [
+            job
+            for story in pending
+            for job in self.voice_generator.collect_voice_jobs(story["nom_dossier"], story["titre"], personnage)
+        ]
+        VoiceWorkerPool(config_path=self.config_path).run(jobs, generator=self.voice_generator)
+        self.voice_generator.record_voice_jobs(jobs)
+        for story in pending:
+            story["voice"] = True
 
         with open("story_todo.json", "w", encoding="utf-8") as f:
             json.dump(story_list, f, indent=4, ensure_ascii=False)
@@ -111,6 +137,11 @@ class MagicStory:
         with open("story_todo.json", encoding="utf-8") as f:
             story_list = json.load(f)
 
+        # transcription de toutes les histoires en attente avec un seul modèle Whisper chargé
+        self.video_story_builder.subtitle_gen.generate_whisper_jsons_for_stories(
+            [(story["titre"], os.path.join(self.global_folder, story["nom_dossier"], "voice")) for story in story_list]
+        )
+
         while story_list:
             story = story_list.pop(0)
             nom_dossier, titre = story["nom_dossier"], story["titre"]
@@ -143,6 +174,7 @@ class MagicStory:
         parser = argparse.ArgumentParser(description="Générateur d'histoires automatiques.")
         parser.add_argument("action", choices=["write", "voice", "generate", "all"])
         parser.add_argument("--count", type=int, default=1)
+        parser.add_argument("--timings", action="store_true", help="affiche le temps de construction de chaque service")
         args = parser.parse_args()
 
         if args.action == "write":
@@ -156,6 +188,9 @@ class MagicStory:
             self.make_all_voice_parts()
             self.generate_final_videos()
 
+        if args.timings:
+            self.context.print_timings()
+
 
 if __name__ == "__main__":
     MagicStory().run()
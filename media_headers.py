@@ -0,0 +1,87 @@
+import os
+import struct
+import wave
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SOI = b"\xff\xd8"
+# marqueurs SOF qui portent les dimensions (C4, C8 et CC sont d'autres segments)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+AUDIO_EXTENSIONS = {".wav"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+
+def read_wav_header(path):
+    # wave ne lit que les chunks d'en-tête, pas les échantillons
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        return {
+            "kind": "audio",
+            "duration": wav.getnframes() / sample_rate,
+            "sample_rate": sample_rate,
+            "channels": wav.getnchannels(),
+        }
+
+
+def read_png_size(f):
+    header = f.read(24)
+    if header[:8] != PNG_SIGNATURE or header[12:16] != b"IHDR":
+        raise ValueError("en-tête PNG invalide")
+    return struct.unpack(">II", header[16:24])
+
+
+def read_jpeg_size(f):
+    if f.read(2) != JPEG_SOI:
+        raise ValueError("en-tête JPEG invalide")
+    while True:
+        byte = f.read(1)
+        while byte and byte != b"\xff":
+            byte = f.read(1)
+        while byte == b"\xff":
+            byte = f.read(1)
+        if not byte:
+            raise ValueError("dimensions JPEG introuvables")
+        marker = byte[0]
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            continue  # marqueurs sans longueur
+        (length,) = struct.unpack(">H", f.read(2))
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack(">xHH", f.read(5))
+            return width, height
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def decode_image_size(path):
+    # dernier recours : décodage complet, avec cv2 comme KenBurnsMotion au moment du rendu
+    import cv2
+
+    image = cv2.imread(path)
+    if image is None:
+        raise ValueError("image illisible")
+    height, width = image.shape[:2]
+    return width, height
+
+
+def read_image_header(path):
+    # le format vient des premiers octets et pas de l'extension : un JPEG enregistré en .png reste lisible
+    with open(path, "rb") as f:
+        magic = f.read(len(PNG_SIGNATURE))
+        f.seek(0)
+        if magic == PNG_SIGNATURE:
+            width, height = read_png_size(f)
+        elif magic.startswith(JPEG_SOI):
+            width, height = read_jpeg_size(f)
+        else:
+            width, height = decode_image_size(path)
+    return {"kind": "image", "width": width, "height": height}
+
+
+def read_media_header(path):
+    """
+    Métadonnées lues dans l'en-tête seulement (aucun décodage). Retourne None pour les autres types de fichiers.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in AUDIO_EXTENSIONS:
+        return read_wav_header(path)
+    if extension in IMAGE_EXTENSIONS:
+        return read_image_header(path)
+    return None
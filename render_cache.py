@@ -0,0 +1,75 @@
+import json
+import os
+
+from content_hash import file_sha256, params_sha256
+
+
+class RenderCache:
+    """
+    Cache des parties vidéo rendues, indexé par le contenu de leurs entrées
+    (image, audio, sous-titres) et par les paramètres de rendu.
+    """
+
+    def __init__(self, video_parts_folder, manifest_name=".render_cache.json", hasher=file_sha256):
+        self.folder = video_parts_folder
+        self.hasher = hasher
+        self.manifest_path = os.path.join(video_parts_folder, manifest_name)
+        self.entries = self._load()
+
+    def _load(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Manifeste de cache illisible, il sera reconstruit : {self.manifest_path}")
+            return {}
+
+    def _save(self):
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.manifest_path)
+
+    def key_for(self, image_path, audio_path, json_path, params):
+        return params_sha256(
+            {
+                "image": self.hasher(image_path),
+                "audio": self.hasher(audio_path),
+                "subtitles": self.hasher(json_path) if json_path and os.path.exists(json_path) else None,
+                "params": params,
+            }
+        )
+
+    def part_path(self, epc):
+        return os.path.join(self.folder, f"{epc}.mp4")
+
+    def is_fresh(self, epc, key):
+        entry = self.entries.get(epc)
+        return bool(entry) and entry.get("key") == key and os.path.exists(self.part_path(epc))
+
+    def store(self, epc, key):
+        self.entries[epc] = {"key": key, "file": f"{epc}.mp4"}
+        self._save()
+
+    def invalidate(self, epc):
+        if self.entries.pop(epc, None) is not None:
+            self._save()
+        if os.path.exists(self.part_path(epc)):
+            os.remove(self.part_path(epc))
+
+    def evict_stale(self, story_epcs):
+        # supprime seulement les parties qui n'appartiennent plus à l'histoire : une partie dont l'image
+        # ou l'audio manque temporairement garde son rendu
+        valid_files = {f"{epc}.mp4" for epc in story_epcs}
+        for name in os.listdir(self.folder):
+            if name.endswith(".mp4") and name not in valid_files:
+                os.remove(os.path.join(self.folder, name))
+                print(f"🗑️ Partie obsolète supprimée : {name}")
+
+        stale = [epc for epc in self.entries if epc not in story_epcs]
+        for epc in stale:
+            del self.entries[epc]
+        if stale:
+            self._save()
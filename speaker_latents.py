@@ -0,0 +1,53 @@
+import io
+
+from content_hash import file_sha256, params_sha256
+from disk_cache import DiskCache
+
+
+class SpeakerLatentCache:
+    """
+    Latents de conditionnement XTTS (gpt_cond_latent + speaker_embedding) calculés une seule fois par voix,
+    indexés par le contenu du WAV de référence et les réglages qui les influencent.
+    """
+
+    def __init__(self, root="cache/speaker_latents", max_mb=50, model_id="xtts_v2"):
+        self.cache = DiskCache(root, max_bytes=int(max_mb * 1024 * 1024), suffix=".pth")
+        self.model_id = model_id
+        self._loaded = {}
+
+    def _conditioning_settings(self, model):
+        config = model.config
+        return {
+            "gpt_cond_len": config.gpt_cond_len,
+            "gpt_cond_chunk_len": config.gpt_cond_chunk_len,
+            "max_ref_length": config.max_ref_len,
+            "sound_norm_refs": config.sound_norm_refs,
+        }
+
+    def key_for(self, voice_path, settings):
+        return params_sha256({"voice": file_sha256(voice_path), "model": self.model_id, "settings": settings})
+
+    def get(self, model, voice_path):
+        """
+        Retourne (gpt_cond_latent, speaker_embedding) pour la voix, depuis la mémoire, le disque ou en les calculant.
+        """
+        import torch
+
+        settings = self._conditioning_settings(model)
+        key = self.key_for(voice_path, settings)
+        if key in self._loaded:
+            return self._loaded[key]
+
+        data = self.cache.get_bytes(key)
+        if data is not None:
+            latents = torch.load(io.BytesIO(data), map_location=model.device)
+            latents = (latents["gpt_cond_latent"], latents["speaker_embedding"])
+        else:
+            print(f"🧬 Calcul des latents de la voix : {voice_path}")
+            latents = model.get_conditioning_latents(audio_path=[voice_path], **settings)
+            buffer = io.BytesIO()
+            torch.save({"gpt_cond_latent": latents[0].cpu(), "speaker_embedding": latents[1].cpu()}, buffer)
+            self.cache.put_bytes(key, buffer.getvalue())
+
+        self._loaded[key] = latents
+        return latents
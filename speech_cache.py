@@ -0,0 +1,32 @@
+import re
+import unicodedata
+
+from content_hash import params_sha256
+from disk_cache import DiskCache
+
+
+def normalize_text(text):
+    # mêmes phrases aux espaces près → même audio
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class SpeechCache:
+    """
+    Cache de l'audio synthétisé phrase par phrase (PCM 16 bits brut), indexé par le texte normalisé,
+    l'empreinte du WAV de la voix, la langue et la version du modèle.
+    """
+
+    def __init__(self, root="cache/speech", max_mb=500):
+        self.cache = DiskCache(root, max_bytes=int(max_mb * 1024 * 1024), suffix=".pcm")
+
+    def key_for(self, text, voice_hash, language, model_id):
+        return params_sha256({"text": normalize_text(text), "voice": voice_hash, "language": language, "model": model_id})
+
+    def contains(self, key):
+        return self.cache.contains(key)
+
+    def get_pcm(self, key):
+        return self.cache.get_bytes(key)
+
+    def put_pcm(self, key, pcm):
+        self.cache.put_bytes(key, pcm)
@@ -12,10 +12,10 @@ from prompt import (
 
 
 class StoryBuilder:
-    def __init__(self, config_path="config.yaml"):
+    def __init__(self, config_path="config.yaml", config=None, llm_client=None):
         self.config_path = config_path
-        self.llm_client = LLMClient()
-        self.config = self._load_config()
+        self.config = config if config is not None else self._load_config()
+        self.llm_client = llm_client or LLMClient(config_path, self.config)
         self.base_story_dir = self.config.get("base_story_dir", "") if self.config else ""
 
     def _load_config(self):
@@ -2,6 +2,7 @@ import platform
 import time
 from pathlib import Path
 
+import yaml
 from databases.image_database import ImageDatabase
 from databases.story_database import StoryDatabase
 from leonardo_client import LeonardoClient
@@ -26,11 +27,20 @@ from prompt import (
 
 
 class StoryImageGenerator:
-    def __init__(self):
-        self.llm_client = LLMClient()
-        self.leonardo = LeonardoClient()
-        self.story_db = StoryDatabase()
-        self.image_db = ImageDatabase()
+    def __init__(self, config_path="config.yaml", config=None, llm_client=None, leonardo=None, story_db=None, image_db=None):
+        self.config = config if config is not None else self._load_config(config_path)
+        self.image_db = image_db or ImageDatabase()
+        self.llm_client = llm_client or LLMClient(config_path, self.config)
+        self.leonardo = leonardo or LeonardoClient(config_path, self.config, self.image_db)
+        self.story_db = story_db or StoryDatabase()
+
+    def _load_config(self, path):
+        try:
+            with open(path, encoding="utf-8") as f:
+                return yaml.safe_load(f)
+        except FileNotFoundError:
+            print(f"❌ Fichier de config introuvable : {path}")
+            return {}
 
     def _get_theme_prompts(self, theme=None):
         theme = theme or self.config.get("theme", "ghibli")
@@ -52,11 +62,9 @@ class StoryImageGenerator:
         return response, neg_prompt
 
     def generate_all_story_images(self, story_title, story_folder):
-        story_parts = self.story_db.get_story_parts(story_title)
-
         self.leonardo.print_user_info()
 
-        to_generate = [p for p in story_parts if not self.image_db.exists(p["epc"])]
+        to_generate = self.story_db.parts_without_image(story_title)
         print(f"\n🖼️ {len(to_generate)} image(s) à générer.")
         self.leonardo.get_total_cost(len(to_generate))
 
@@ -14,13 +14,24 @@ from story_image_generator import StoryImageGenerator
 
 
 class StoryProcessor:
-    def __init__(self, config_path="config.yaml"):
-        self.llm = LLMClient()
-        self.story_image_generator = StoryImageGenerator()
-        self.builder = StoryBuilder()
-        self.story_db = StoryDatabase()
-        self.character_db = PersonnageDatabase()
-        self.config = self._load_config(config_path)
+    def __init__(
+        self,
+        config_path="config.yaml",
+        config=None,
+        llm=None,
+        story_image_generator=None,
+        builder=None,
+        story_db=None,
+        character_db=None,
+    ):
+        self.config = config if config is not None else self._load_config(config_path)
+        self.llm = llm or LLMClient(config_path, self.config)
+        self.story_db = story_db or StoryDatabase()
+        self.story_image_generator = story_image_generator or StoryImageGenerator(
+            config_path, self.config, llm_client=self.llm, story_db=self.story_db
+        )
+        self.builder = builder or StoryBuilder(config_path, self.config, llm_client=self.llm)
+        self.character_db = character_db or PersonnageDatabase()
 
     def _load_config(self, path):
         try:
@@ -98,8 +109,8 @@ class StoryProcessor:
         story = "\n\n".join(parts)
         self.builder.generate_youtube_info(folder, story)
 
-        for part in parts:
-            self.story_db.add_or_update_story(title, part)
+        # toutes les pages en une transaction
+        self.story_db.upsert_parts(title, [{"text_part": part} for part in parts])
 
         # 5. Traiter les personnages
         self._process_characters(character_section, title)
@@ -114,13 +125,18 @@ class StoryProcessor:
         )
         matches = pattern.findall(text)
 
+        characters = []
         for names, description in matches:
             name_list = [n.strip() for n in names.split(",") if n.strip()]
             description = description.strip()
             print(f"👤 Personnage détecté : {name_list} — {description}")
-            self.character_db.add_or_update(title, name_list, description)
+            characters.append((name_list, description))
+        if characters:
+            self.character_db.upsert_characters(title, characters)
 
     def enrich_story_with_descriptions(self, story_parts):
+        characters_by_title = {}
+        enriched_by_title = {}
         for element in story_parts:
             title = element["titre"]
             epc = element["epc"]
@@ -128,7 +144,9 @@ class StoryProcessor:
             enriched_text = original_text
             modified = set()
 
-            characters = self.character_db.get_by_title(title)
+            if title not in characters_by_title:
+                characters_by_title[title] = self.character_db.get_by_title(title)
+            characters = characters_by_title[title]
 
             for char in characters:
                 try:
@@ -152,10 +170,17 @@ class StoryProcessor:
                     if count > 0:
                         break
 
-            self.story_db.add_or_update_story(titre=title, text_part=original_text, text_with_description=enriched_text, epc=epc)
+            enriched_by_title.setdefault(title, []).append(
+                {"text_part": original_text, "text_with_description": enriched_text, "epc": epc}
+            )
             print(f"✅ Texte enrichi pour epc : {epc}")
 
+        # écriture en une transaction par histoire : jamais d'histoire à moitié enrichie en base
+        for title, parts in enriched_by_title.items():
+            self.story_db.upsert_parts(title, parts)
+
     def add_prompts_to_story(self, story_parts, theme=None):
+        prompts = []
         for element in story_parts:
             epc = element["epc"]
             # title = element["titre"]
@@ -166,8 +191,11 @@ class StoryProcessor:
                 continue
 
             prompt, neg_prompt = self.story_image_generator.get_picture_prompt(self.config["ia_generative"], enriched_text, theme)
-            self.story_db.update_prompts(epc, prompt, neg_prompt)
-            print(f"🧠 Prompt ajouté pour epc : {epc}")
+            prompts.append((epc, prompt, neg_prompt))
+            print(f"🧠 Prompt généré pour epc : {epc}")
+
+        if prompts:
+            self.story_db.update_prompts_many(prompts)
 
     def insert_new_story_in_db(self, folder_name):
         story_path = os.path.join(self.config.get("base_story_dir", ""), folder_name, f"{folder_name}.txt")
@@ -214,3 +242,9 @@ class StoryProcessor:
     def print_story_info(self, title):
         self.character_db.print_by_title(title)
         self.story_db.print_story_by_title(title)
+        progress = self.story_db.story_progress(title)
+        if progress:
+            print(
+                f"📊 {progress['parties']} parties : {progress['descriptions']} descriptions, {progress['prompts']} prompts, "
+                f"{progress['images']} images, {progress['personnages']} personnages"
+            )
@@ -1,49 +1,125 @@
 import json
 import os
-import subprocess
-import tempfile
 import textwrap
 
 import yaml
 from databases.story_database import StoryDatabase
-from transcript import run_whisper_main
+from transcript import WhisperTranscriber
+from transcription_cache import TranscriptionCache
+from vad_timing import VadSubtitleTimer
 
+ASS_HEADER = """[Script Info]
+ScriptType: v4.00+
+PlayResX: 1024
+PlayResY: 768
+Timer: 100.0000
 
-class SubtitleGenerator:
-    def __init__(self, db_path=None):
-        self.story_db = StoryDatabase(db_path)
+[V4+ Styles]
+Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut,
+ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
+Style: Default,Arial,30,&H00F5F5F5,&H000000FF,&H00000000,&H64000000,-1,0,0,0,100,100,0,0,1,2,0,2,40,40,20,1
 
-        config_path = "config.yaml"
-        try:
-            with open(config_path, encoding="utf-8") as f:
-                self.config = yaml.safe_load(f)
-        except FileNotFoundError:
-            print(f"❌ Fichier config introuvable : {config_path}")
-            self.config = {}
-
-    def run_whisper_transcription(self, wav_path, json_output_path, reference_text):
-        whisper_venv_python = os.path.abspath(os.path.join("..", "whisper", "whisper_env", "bin", "python"))
-        transcript_script = os.path.abspath(os.path.join("..", "whisper", "transcript.py"))
-
-        words_per_line = str(self.config.get("words_per_line", 5))
-
-        if not os.path.isfile(whisper_venv_python):
-            raise RuntimeError(f"❌ Python introuvable dans le venv : {whisper_venv_python}")
-
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".txt", delete=False, encoding="utf-8") as tmp:
-            tmp.write(reference_text)
-            tmp_path = tmp.name
-
-        try:
-            # command = [whisper_venv_python, transcript_script, wav_path, json_output_path, tmp_path, words_per_line]
-            # print(f"🔁 Exécution de Whisper : {' '.join(command)}")
-            # subprocess.run(command, check=True)
-            run_whisper_main(wav_path, json_output_path, tmp_path, words_per_line)
-        finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+[Events]
+Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
+"""
 
-    def generate_whisper_jsons(self, title, voice_dir):
+
+def format_ass_time(seconds):
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+    centis = int((seconds % 1) * 100)
+    return f"{hours}:{minutes:02}:{secs:02}.{centis:02}"
+
+
+def format_srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3_600_000)
+    minutes, millis = divmod(millis, 60_000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02}:{minutes:02}:{secs:02},{millis:03}"
+
+
+class SubtitleWriter:
+    """Écrit les pistes ASS / SRT à partir des JSON de sous-titres : ni Whisper ni base, suffit aux process de rendu."""
+
+    def _load_segments(self, json_subs_path):
+        if not os.path.exists(json_subs_path):
+            print(f"⚠️ JSON de sous-titres introuvable : {json_subs_path}")
+            return None
+
+        with open(json_subs_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _ass_events(self, segments, offset=0.0):
+        events = []
+        for seg in segments:
+            start = format_ass_time(seg["start"] + offset)
+            end = format_ass_time(seg["end"] + offset)
+            wrapped_lines = textwrap.wrap(seg["text"], width=100)
+            ass_text = r"\N".join(wrapped_lines)
+            events.append(f"Dialogue: 0,{start},{end},Default,,0,0,0,,{ass_text}\n")
+        return events
+
+    def write_ass_file(self, json_subs_path, ass_path):
+        segments = self._load_segments(json_subs_path)
+        if segments is None:
+            return False
+
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(ASS_HEADER + "".join(self._ass_events(segments)))
+        return True
+
+    def write_story_subtitles(self, parts, ass_path, srt_path):
+        """
+        Compile une seule piste (ASS + SRT) pour toute l'histoire.
+        parts : liste de (json de la partie, début de la partie dans la vidéo finale en secondes).
+        """
+        ass_events = []
+        srt_blocks = []
+        for json_subs_path, offset in parts:
+            segments = self._load_segments(json_subs_path)
+            if not segments:
+                continue
+
+            ass_events += self._ass_events(segments, offset)
+            for seg in segments:
+                start = format_srt_time(seg["start"] + offset)
+                end = format_srt_time(seg["end"] + offset)
+                srt_blocks.append(f"{len(srt_blocks) + 1}\n{start} --> {end}\n{seg['text']}\n")
+
+        with open(ass_path, "w", encoding="utf-8") as f:
+            f.write(ASS_HEADER + "".join(ass_events))
+        with open(srt_path, "w", encoding="utf-8") as f:
+            f.write("\n".join(srt_blocks))
+
+        print(f"✅ Sous-titres de l'histoire : {ass_path} / {srt_path} ({len(srt_blocks)} lignes)")
+        return len(srt_blocks)
+
+
+class SubtitleGenerator(SubtitleWriter):
+    def __init__(self, db_path=None, config=None, story_db=None):
+        self.story_db = story_db or StoryDatabase(db_path)
+
+        config_path = "config.yaml"
+        if config is not None:
+            self.config = config
+        else:
+            try:
+                with open(config_path, encoding="utf-8") as f:
+                    self.config = yaml.safe_load(f)
+            except FileNotFoundError:
+                print(f"❌ Fichier config introuvable : {config_path}")
+                self.config = {}
+
+        self.transcriber = WhisperTranscriber.from_config(self.config)
+        self.vad_timer = VadSubtitleTimer()
+        self.transcription_cache = TranscriptionCache(
+            self.config.get("transcription_cache_dir", "cache/transcriptions"),
+            self.config.get("transcription_cache_max_mb", 200),
+        )
+
+    def collect_whisper_jobs(self, title, voice_dir):
         story_elements = self.story_db.get_story_parts(title)
         intro_outro_path = os.path.join(os.path.dirname(voice_dir), "intro_outro.txt")
 
@@ -52,6 +128,7 @@ class SubtitleGenerator:
         intro = contenu.split("Intro :", 1)[1].split("Outro :", 1)[0].strip()
         outro = contenu.split("Outro :", 1)[1].strip()
 
+        jobs = []
         for i, element in enumerate(story_elements):
             epc = element.get("epc")
             if not epc:
@@ -71,75 +148,69 @@ class SubtitleGenerator:
             if i == len(story_elements) - 1:
                 reference_text = reference_text + "\n" + outro
 
-            if not os.path.exists(json_path):
-                self.run_whisper_transcription(wav_path, json_path, reference_text)
-            else:
-                print(f"⏩ JSON déjà présent, skip transcription pour '{epc}'")
+            jobs.append({"epc": epc, "wav_path": wav_path, "json_path": json_path, "reference_text": reference_text})
+        return jobs
 
-            if not os.path.isfile(json_path):
-                print(f"❌ JSON Whisper manquant pour '{epc}' → {json_path}")
-                continue
+    def generate_whisper_jsons(self, title, voice_dir):
+        self.generate_whisper_jsons_for_stories([(title, voice_dir)])
+
+    def generate_whisper_jsons_for_stories(self, stories):
+        jobs = []
+        for title, voice_dir in stories:
+            # une histoire incomplète (intro_outro.txt absent ou mal formé) ne bloque pas les autres
+            try:
+                jobs += self.collect_whisper_jobs(title, voice_dir)
+            except (OSError, IndexError) as e:
+                print(f"⚠️ Sous-titres ignorés pour « {title} » : intro_outro.txt absent ou invalide ({e})")
+        words_per_line = int(self.config.get("words_per_line", 5))
+
+        if self.config.get("subtitle_timing", "whisper") == "vad":
+            self.generate_vad_jsons(jobs, words_per_line)
+            return
 
-            print(f"✅ json fixed pour {epc}: {json_path}")
+        pending = []
+        for job in jobs:
+            job["cache_key"] = self.transcription_cache.key_for(job["wav_path"], job["reference_text"], self.transcriber.model_id)
+            words = self.transcription_cache.get_words(job["cache_key"])
+            if words is None:
+                pending.append(job)
+            else:
+                print(f"⏩ Transcription en cache pour '{job['epc']}'")
+                self._write_subtitle_jsons(job, words, words_per_line)
 
-    def burn_subtitles_on_video_from_json(self, video_path, json_subs_path, output_path):
-        if not os.path.exists(json_subs_path):
-            print(f"⚠️ JSON de sous-titres introuvable : {json_subs_path}")
-            return
+        # toutes les parties (de toutes les histoires) passent dans le même modèle chargé une seule fois
+        transcriptions = self.transcriber.transcribe_batch([job["wav_path"] for job in pending])
+        for job in pending:
+            if job["wav_path"] not in transcriptions:
+                continue
+            words = self.transcriber.align_transcription(transcriptions[job["wav_path"]], job["reference_text"])
+            self.transcription_cache.put_words(job["cache_key"], words)
+            self._write_subtitle_jsons(job, words, words_per_line)
 
-        with open(json_subs_path, encoding="utf-8") as f:
-            segments = json.load(f)
+        for job in jobs:
+            if not os.path.isfile(job["json_path"]):
+                print(f"❌ JSON Whisper manquant pour '{job['epc']}' → {job['json_path']}")
+                continue
 
-        def format_ass_time(seconds):
-            hours = int(seconds // 3600)
-            minutes = int((seconds % 3600) // 60)
-            secs = int(seconds % 60)
-            centis = int((seconds % 1) * 100)
-            return f"{hours}:{minutes:02}:{secs:02}.{centis:02}"
+            print(f"✅ json fixed pour {job['epc']}: {job['json_path']}")
 
-        ass_header = """[Script Info]
-ScriptType: v4.00+
-PlayResX: 1024
-PlayResY: 768
-Timer: 100.0000
+    def generate_vad_jsons(self, jobs, words_per_line):
+        # mode rapide : le texte est connu, on cale seulement les mots sur les zones de parole du WAV
+        for job in jobs:
+            words = self.vad_timer.time_words(job["wav_path"], job["reference_text"])
+            segments = self.transcriber.extract_text_segment(job["reference_text"], words, words_per_line)
+            self._save_subtitle_jsons(job, words, segments)
+            print(f"⚡ Sous-titres calés par VAD pour {job['epc']}: {job['json_path']}")
 
-[V4+ Styles]
-Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, Italic, Underline, StrikeOut,
-ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, Alignment, MarginL, MarginR, MarginV, Encoding
-Style: Default,Arial,30,&H00F5F5F5,&H000000FF,&H00000000,&H64000000,-1,0,0,0,100,100,0,0,1,2,0,2,40,40,20,1
+    def _write_subtitle_jsons(self, job, words, words_per_line):
+        # le découpage en lignes ne relance jamais Whisper : il part des mots horodatés en cache
+        segments = self.transcription_cache.get_segments(job["cache_key"], words_per_line)
+        if segments is None:
+            segments = self.transcriber.extract_text_segment(job["reference_text"], words, words_per_line)
+            self.transcription_cache.put_segments(job["cache_key"], words_per_line, segments)
 
-[Events]
-Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text
-"""
+        self._save_subtitle_jsons(job, words, segments)
 
-        ass_events = ""
-        for seg in segments:
-            start = format_ass_time(seg["start"])
-            end = format_ass_time(seg["end"])
-            wrapped_lines = textwrap.wrap(seg["text"], width=100)
-            ass_text = r"\N".join(wrapped_lines)
-            ass_events += f"Dialogue: 0,{start},{end},Default,,0,0,0,,{ass_text}\n"
-
-        ass_content = ass_header + ass_events
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".ass", mode="w", encoding="utf-8") as tmp_ass:
-            tmp_ass.write(ass_content)
-            tmp_ass_path = tmp_ass.name
-
-        command = [
-            "ffmpeg",
-            "-i",
-            video_path,
-            "-vf",
-            f"ass={tmp_ass_path}",
-            "-c:v",
-            "libx264",
-            "-c:a",
-            "copy",
-            "-shortest",
-            output_path,
-        ]
-
-        print("🛠️ Commande ffmpeg :", " ".join(command))
-        subprocess.run(command, check=True)
-        print(f"✅ Vidéo exportée avec sous-titres : {output_path}")
+    def _save_subtitle_jsons(self, job, words, segments):
+        self.transcriber.save_transcription(words, job["json_path"].replace(".json", "_word_by_word.json"))
+        self.transcriber.save_transcription(segments, job["json_path"])
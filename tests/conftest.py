@@ -0,0 +1,9 @@
+import pytest
+from databases.connection import close_connections
+
+
+@pytest.fixture(autouse=True)
+def _close_sqlite_connections():
+    # chaque test travaille sur ses propres fichiers : on ne garde aucune connexion ouverte entre deux tests
+    yield
+    close_connections()
@@ -0,0 +1,111 @@
+import os
+import sqlite3
+
+from databases.image_database import ImageDatabase
+from databases.migrate_legacy import migrate_legacy
+from databases.personnage_database import PersonnageDatabase
+from databases.schema import legacy_files
+from databases.story_database import StoryDatabase, text_hash
+
+TITLE = "Le Loup"
+
+
+def make_legacy_files(folder, with_text_hash=False):
+    # anciennes bases : une par table ; with_text_hash = histoires.db déjà passée par la migration des index
+    paths = legacy_files(str(folder))
+    conn = sqlite3.connect(paths["legacy_histoires"])
+    conn.execute("""
+        CREATE TABLE histoires (id INTEGER PRIMARY KEY AUTOINCREMENT, titre TEXT NOT NULL, text_part TEXT NOT NULL,
+            text_with_description TEXT, image_prompt TEXT, negative_prompt TEXT, temps_lecture_sec INTEGER, epc TEXT UNIQUE)
+    """)
+    if with_text_hash:
+        conn.execute("ALTER TABLE histoires ADD COLUMN text_hash TEXT")
+    for idx, text in enumerate(["Il était une fois.", "Le loup chante.", "Fin."], start=1):
+        conn.execute("INSERT INTO histoires (titre, text_part, epc) VALUES (?, ?, ?)", (TITLE, text, f"le_loup_{idx}"))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(paths["legacy_personnages"])
+    conn.execute("""
+        CREATE TABLE personnages (id INTEGER PRIMARY KEY AUTOINCREMENT, titre TEXT NOT NULL, noms TEXT NOT NULL,
+            description TEXT NOT NULL, UNIQUE(titre, noms))
+    """)
+    conn.execute("INSERT INTO personnages (titre, noms, description) VALUES (?, ?, 'gris')", (TITLE, '["Loup"]'))
+    conn.commit()
+    conn.close()
+
+    conn = sqlite3.connect(paths["legacy_images"])
+    conn.execute(
+        "CREATE TABLE images (epc TEXT PRIMARY KEY, width INTEGER, height INTEGER, inference_steps INTEGER, "
+        "prompt_magic BOOLEAN, alchemy_mode BOOLEAN, high_resolution BOOLEAN, is_custom_model BOOLEAN, "
+        "is_sdxl BOOLEAN, autres_parametres TEXT, prompt TEXT, negative_prompt TEXT, model_id TEXT, preset_style TEXT)"
+    )
+    conn.execute("INSERT INTO images (epc, width) VALUES ('le_loup_2', 512), ('autre_9', 512)")
+    conn.commit()
+    conn.close()
+    return paths
+
+
+def test_migration_backfills_text_hash_for_both_legacy_versions(tmp_path):
+    for with_text_hash in (False, True):
+        folder = tmp_path / f"legacy_{with_text_hash}"
+        folder.mkdir()
+        paths = make_legacy_files(folder, with_text_hash)
+        target = str(tmp_path / f"cible_{with_text_hash}.db")
+
+        counts = migrate_legacy(target, paths)
+        assert counts == {"stories": 1, "histoires": 3, "personnages": 1, "images": 2}
+
+        db = StoryDatabase(target)
+        parts = db.get_story_parts(TITLE)
+        assert [p["text_hash"] for p in parts] == [text_hash(p["text_part"]) for p in parts]
+        # la recherche par empreinte retrouve la page migrée au lieu de la réinsérer
+        db.add_or_update_story(TITLE, "Le loup chante.", "Le loup (gris) chante.")
+        assert len(db.get_story_parts(TITLE)) == 3
+
+
+def test_database_next_to_legacy_files_is_migrated_automatically(tmp_path):
+    make_legacy_files(tmp_path)
+
+    db = StoryDatabase(str(tmp_path / "magic_story.db"))
+    assert [p["epc"] for p in db.get_story_parts(TITLE)] == ["le_loup_1", "le_loup_2", "le_loup_3"]
+    # une seule fois : le drapeau posé par la migration est relu au démarrage suivant
+    StoryDatabase(str(tmp_path / "magic_story.db"))
+    assert len(db.get_story_parts(TITLE)) == 3
+
+
+def test_images_only_legacy_set_is_migrated_once(tmp_path):
+    paths = make_legacy_files(tmp_path)
+    os.remove(paths["legacy_histoires"])
+    os.remove(paths["legacy_personnages"])
+    db_path = str(tmp_path / "magic_story.db")
+
+    # aucune histoire migrée : c'est le drapeau, pas la table stories, qui empêche de rejouer la migration
+    StoryDatabase(db_path)
+    images = ImageDatabase(db_path)
+    assert images.search_by_title("le_loup") == ["le_loup_2"]
+
+
+def test_empty_legacy_files_are_migrated_once(tmp_path, capsys):
+    for path in legacy_files(str(tmp_path)).values():
+        sqlite3.connect(path).close()
+    db_path = str(tmp_path / "magic_story.db")
+
+    StoryDatabase(db_path)
+    assert "migration automatique" in capsys.readouterr().out
+    ImageDatabase(db_path)
+    PersonnageDatabase(db_path)
+    assert "migration automatique" not in capsys.readouterr().out
+
+
+def test_parts_without_image_counts_unlinked_images(tmp_path):
+    db_path = str(tmp_path / "magic_story.db")
+    images = ImageDatabase(db_path)
+    # image enregistrée avant sa partie : part_id reste NULL
+    images.add_entry("le_loup_1", width=512)
+    db = StoryDatabase(db_path)
+    db.add_or_update_story(TITLE, "Il était une fois.")
+    db.add_or_update_story(TITLE, "Fin.")
+
+    assert [p["epc"] for p in db.parts_without_image(TITLE)] == ["le_loup_2"]
+    assert db.story_progress(TITLE)["images"] == 1
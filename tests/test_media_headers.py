@@ -0,0 +1,38 @@
+import struct
+
+import cv2
+import numpy as np
+from media_headers import PNG_SIGNATURE, read_media_header
+
+
+def png_bytes(width, height):
+    return PNG_SIGNATURE + struct.pack(">I", 13) + b"IHDR" + struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+
+
+def jpeg_bytes(width, height):
+    # SOI, un segment APP0 à sauter, puis SOF0 avec les dimensions
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\x00" + bytes(9)
+    sof0 = b"\xff\xc0" + struct.pack(">HBHHB", 11, 8, height, width, 1) + bytes(3)
+    return b"\xff\xd8" + app0 + sof0
+
+
+def test_size_read_from_headers(tmp_path):
+    (tmp_path / "a.png").write_bytes(png_bytes(1024, 768))
+    (tmp_path / "b.jpg").write_bytes(jpeg_bytes(640, 480))
+    assert read_media_header(str(tmp_path / "a.png")) == {"kind": "image", "width": 1024, "height": 768}
+    assert read_media_header(str(tmp_path / "b.jpg")) == {"kind": "image", "width": 640, "height": 480}
+
+
+def test_mislabelled_images_use_their_real_format(tmp_path):
+    (tmp_path / "jpeg.png").write_bytes(jpeg_bytes(640, 480))
+    (tmp_path / "png.jpg").write_bytes(png_bytes(1024, 768))
+    assert read_media_header(str(tmp_path / "jpeg.png"))["width"] == 640
+    assert read_media_header(str(tmp_path / "png.jpg"))["width"] == 1024
+
+
+def test_unknown_format_is_decoded(tmp_path):
+    # ni PNG ni JPEG (ici un BMP) : décodage complet, comme au rendu
+    path = tmp_path / "bmp.png"
+    _, data = cv2.imencode(".bmp", np.zeros((30, 40, 3), dtype=np.uint8))
+    path.write_bytes(data.tobytes())
+    assert read_media_header(str(path)) == {"kind": "image", "width": 40, "height": 30}
@@ -0,0 +1,42 @@
+import sqlite3
+
+import pytest
+from databases.migrations import migrate, schema_version
+
+
+def _backfill_upper(conn):
+    rows = conn.execute("SELECT id, name FROM items").fetchall()
+    conn.executemany("UPDATE items SET name_upper = ? WHERE id = ?", [(name.upper(), id_) for id_, name in rows])
+
+
+MIGRATIONS = (
+    ("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT NOT NULL)",),
+    (
+        "ALTER TABLE items ADD COLUMN name_upper TEXT",
+        _backfill_upper,
+        "CREATE INDEX idx_items_name_upper ON items(name_upper)",
+    ),
+)
+
+
+def test_migrations_apply_in_order_and_record_the_version(tmp_path):
+    conn = sqlite3.connect(tmp_path / "test.db")
+    assert migrate(conn, MIGRATIONS[:1]) == 1
+    conn.execute("INSERT INTO items (name) VALUES ('luciole')")
+    conn.commit()
+
+    assert migrate(conn, MIGRATIONS) == 2
+    assert conn.execute("SELECT name_upper FROM items").fetchall() == [("LUCIOLE",)]
+    # idempotent : relancer ne rejoue rien
+    assert migrate(conn, MIGRATIONS) == 2
+
+
+def test_failed_migration_is_rolled_back(tmp_path):
+    conn = sqlite3.connect(tmp_path / "test.db")
+    migrate(conn, MIGRATIONS[:1])
+    broken = MIGRATIONS[:1] + (("ALTER TABLE items ADD COLUMN extra TEXT", "SELECT * FROM table_absente"),)
+
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(conn, broken)
+    assert schema_version(conn) == 1
+    assert "extra" not in [row[1] for row in conn.execute("PRAGMA table_info(items)")]
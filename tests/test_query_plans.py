@@ -0,0 +1,95 @@
+import os
+import re
+
+from databases.connection import get_connection
+from databases.image_database import ImageDatabase
+from databases.media_index_database import MediaIndexDatabase
+from databases.personnage_database import PersonnageDatabase
+from databases.story_database import StoryDatabase
+
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def run_pipeline_queries(folder):
+    """
+    Appelle les méthodes du pipeline sur des bases neuves et retourne {chemin de la base: requêtes exécutées}.
+    """
+    db_path = os.path.join(folder, "magic_story.db")
+    story_db = StoryDatabase(db_path)
+    character_db = PersonnageDatabase(db_path)
+    image_db = ImageDatabase(db_path)
+    media_index = MediaIndexDatabase(os.path.join(folder, "media_index.db"))
+
+    # les requêtes de création / migration ne comptent pas : on trace uniquement l'usage courant
+    statements = {}
+    for path in (db_path, media_index.db_path):
+        statements[path] = captured = []
+        get_connection(path).set_trace_callback(captured.append)
+
+    title = "La forêt des lucioles"
+    story_db.add_or_update_story(title, "Il était une fois une luciole.")
+    story_db.add_or_update_story(title, "Il était une fois une luciole.", "Une luciole (petite, verte).")
+    story_db.upsert_parts(title, [{"text_part": "Elle brillait la nuit."}, {"text_part": "Fin."}])
+    epcs = [part["epc"] for part in story_db.get_story_parts(title)]
+    story_db.upsert_parts(title, [{"text_part": "Fin.", "text_with_description": "Fin !", "epc": epcs[-1]}])
+    story_db.add_or_update_story(title, "Fin.", "Fin !", epc=epcs[-1])
+    story_db.update_prompts(epcs[0], "prompt", "negative")
+    story_db.update_prompts_many([(epc, "prompt", "negative") for epc in epcs])
+    story_db.update_reading_time(epcs[0], 12)
+    story_db.update_reading_times([(epc, 12) for epc in epcs])
+    story_db.print_story_by_title(title)
+
+    character_db.add_or_update(title, ["Lumi"], "une luciole")
+    character_db.upsert_characters(title, [(["Lumi"], "une luciole verte"), (["Hibou"], "un vieux hibou")])
+    character_db.get_by_title(title)
+
+    image_db.add_entry(epcs[0], width=512, height=512)
+    image_db.exists(epcs[0])
+    image_db.search_by_title(title)
+    image_db.pretty_print_entry(epcs[0])
+    story_db.parts_without_image(title)
+    story_db.story_progress(title)
+    image_db.delete_entry(epcs[0])
+
+    media_folder = os.path.join(folder, "media")
+    os.makedirs(media_folder)
+    media_index.refresh(media_folder)
+    media_index.get(os.path.join(media_folder, "absent.wav"))
+    media_index.images_by_stem(media_folder)
+
+    for path in statements:
+        get_connection(path).set_trace_callback(None)
+    return statements
+
+
+def test_every_pipeline_query_is_index_backed(tmp_path):
+    statements = run_pipeline_queries(str(tmp_path))
+
+    checked = 0
+    failures = []
+    for db_path, executed in statements.items():
+        conn = get_connection(db_path)
+        seen = set()
+        for sql in executed:
+            sql = " ".join(sql.split())
+            shape = LITERAL.sub("?", sql)
+            if not sql.upper().startswith(("SELECT", "UPDATE", "DELETE")) or shape in seen:
+                continue
+            seen.add(shape)
+            checked += 1
+
+            plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+            # SCAN ... USING COVERING INDEX reste un parcours complet : seul SEARCH est accepté
+            if any(step.startswith("SCAN") or "TEMP B-TREE" in step for step in plan):
+                failures.append(f"{shape}\n    " + "\n    ".join(plan))
+
+    assert checked >= 20
+    assert not failures, "requêtes sans index :\n" + "\n".join(failures)
+
+
+def test_plan_check_detects_a_table_scan(tmp_path):
+    # garde-fou : le critère doit bien refuser un LIKE sur la clé, qui parcourt toute la table
+    conn = get_connection(str(tmp_path / "magic_story.db"))
+    StoryDatabase(str(tmp_path / "magic_story.db"))
+    plan = [row[3] for row in conn.execute("EXPLAIN QUERY PLAN SELECT epc FROM histoires WHERE epc LIKE 'la_%'")]
+    assert any(step.startswith("SCAN") for step in plan)
@@ -0,0 +1,60 @@
+from databases.personnage_database import PersonnageDatabase
+from databases.story_database import StoryDatabase
+
+TITLE = "La forêt des lucioles"
+
+
+def test_upsert_parts_generates_epcs_from_ids(tmp_path):
+    db = StoryDatabase(str(tmp_path / "magic_story.db"))
+    db.upsert_parts(TITLE, [{"text_part": "Il était une fois."}, {"text_part": "Fin."}])
+
+    parts = db.get_story_parts(TITLE)
+    assert [p["epc"] for p in parts] == [f"la_forêt_des_lucioles_{p['id']}" for p in parts]
+    assert [p["text_part"] for p in parts] == ["Il était une fois.", "Fin."]
+
+
+def test_upsert_parts_merges_duplicate_pages_in_one_batch(tmp_path):
+    db = StoryDatabase(str(tmp_path / "magic_story.db"))
+    db.upsert_parts(
+        TITLE,
+        [
+            {"text_part": "Refrain.", "text_with_description": "v1"},
+            {"text_part": "Couplet."},
+            {"text_part": "Refrain.", "text_with_description": "v2"},
+        ],
+    )
+
+    parts = db.get_story_parts(TITLE)
+    assert [(p["text_part"], p["text_with_description"]) for p in parts] == [("Refrain.", "v2"), ("Couplet.", None)]
+
+
+def test_upsert_parts_updates_existing_pages(tmp_path):
+    db = StoryDatabase(str(tmp_path / "magic_story.db"))
+    db.upsert_parts(TITLE, [{"text_part": "Page."}])
+    epc = db.get_story_parts(TITLE)[0]["epc"]
+
+    db.upsert_parts(TITLE, [{"text_part": "Page."}])
+    db.upsert_parts(TITLE, [{"text_part": "Page.", "text_with_description": "Page !", "epc": epc}])
+    parts = db.get_story_parts(TITLE)
+    assert len(parts) == 1
+    assert parts[0]["text_with_description"] == "Page !"
+
+
+def test_update_prompts_many(tmp_path):
+    db = StoryDatabase(str(tmp_path / "magic_story.db"))
+    db.upsert_parts(TITLE, [{"text_part": "A."}, {"text_part": "B."}])
+    epcs = [p["epc"] for p in db.get_story_parts(TITLE)]
+
+    db.update_prompts_many([(epc, f"prompt {epc}", "negative") for epc in epcs] + [("inconnu", "x", "y")])
+    assert [(p["image_prompt"], p["negative_prompt"]) for p in db.get_story_parts(TITLE)] == [
+        (f"prompt {epc}", "negative") for epc in epcs
+    ]
+
+
+def test_upsert_characters_updates_description(tmp_path):
+    characters = PersonnageDatabase(str(tmp_path / "magic_story.db"))
+    characters.upsert_characters(TITLE, [(["Lumi"], "une luciole"), (["Hibou", "Hulotte"], "un vieux hibou")])
+    characters.upsert_characters(TITLE, [(["Lumi"], "une luciole verte")])
+
+    rows = {row["noms"]: row["description"] for row in characters.get_by_title(TITLE)}
+    assert rows == {'["Lumi"]': "une luciole verte", '["Hibou", "Hulotte"]': "un vieux hibou"}
@@ -0,0 +1,99 @@
+import random
+
+import pytest
+from transcript import WhisperTranscriber
+from word_alignment import WordAligner
+
+
+def noisy_transcription(n_words, seed=0):
+    # texte de référence + transcription bruitée : mots oubliés, déformés et ajoutés, avec l'index attendu
+    rng = random.Random(seed)
+    vocab = ["".join(rng.choice("abcdefghijklmnopqrstuvwxyzéè") for _ in range(rng.randint(1, 9))) for _ in range(2000)]
+    ref = [rng.choice(vocab) for _ in range(n_words)]
+    heard, truth = [], []
+    for idx, word in enumerate(ref):
+        draw = rng.random()
+        if draw < 0.05:
+            continue
+        heard.append(word[:-1] + "x" if draw < 0.12 and len(word) > 2 else word)
+        truth.append(idx)
+        if rng.random() < 0.03:
+            heard.append("euh")
+            truth.append(None)
+    return heard, ref, truth
+
+
+def alignment_score(aligner, alignment, n_ref):
+    # score du chemin : similarité - match_offset par mot apparié, pénalité pour chaque mot laissé de côté
+    sims = [sim for ref_idx, sim in alignment if ref_idx is not None]
+    unmatched = (len(alignment) - len(sims)) * aligner.gap_heard + (n_ref - len(sims)) * aligner.gap_ref
+    return sum(sims) - len(sims) * aligner.match_offset + unmatched
+
+
+def test_exact_transcription_maps_word_for_word():
+    ref = ["Il", "était", "une", "fois", "une", "luciole"]
+    alignment = WordAligner().align([w.lower() for w in ref], ref)
+    assert [ref_idx for ref_idx, _ in alignment] == list(range(len(ref)))
+
+
+def test_short_a_matches_accented_a():
+    alignment = WordAligner().align(["le", "chat", "a", "mangé"], ["Le", "chat", "à", "mangé", "la", "souris"])
+    assert [ref_idx for ref_idx, _ in alignment] == [0, 1, 2, 3]
+
+
+def test_filler_word_is_left_unmatched():
+    alignment = WordAligner().align(["euh", "le", "chat"], ["le", "chat"])
+    assert [ref_idx for ref_idx, _ in alignment] == [None, 0, 1]
+
+
+def test_empty_inputs():
+    aligner = WordAligner()
+    assert aligner.align([], ["mot"]) == []
+    assert aligner.align(["mot"], []) == [(None, 0.0)]
+
+
+def test_noisy_transcription_accuracy():
+    heard, ref, truth = noisy_transcription(1000)
+    alignment = WordAligner().align(heard, ref)
+    accuracy = sum(ref_idx == expected for (ref_idx, _), expected in zip(alignment, truth)) / len(truth)
+    assert accuracy >= 0.97
+
+
+def test_indices_are_monotonic_on_long_parts():
+    heard, ref, _ = noisy_transcription(5000, seed=1)
+    indices = [ref_idx for ref_idx, _ in WordAligner().align(heard, ref) if ref_idx is not None]
+    assert indices == sorted(indices)
+    assert len(set(indices)) == len(indices)
+
+
+def test_banded_alignment_matches_full_dp():
+    narrow = WordAligner(band=4, block_size=5)
+    for seed in range(100):
+        heard, ref, _ = noisy_transcription(40 + seed % 60, seed=seed)
+        full = WordAligner(band=len(ref))
+        expected = alignment_score(full, full.align(heard, ref), len(ref))
+        assert alignment_score(narrow, narrow.align(heard, ref), len(ref)) == pytest.approx(expected), seed
+
+
+def test_band_widens_around_a_skipped_passage():
+    # 20 mots de la référence jamais lus : le chemin sort de la bande initiale
+    heard, ref, _ = noisy_transcription(100, seed=3)
+    heard = heard[:30] + heard[50:]
+    narrow, full = WordAligner(band=4, block_size=5), WordAligner(band=len(ref))
+    assert narrow.align(heard, ref) == full.align(heard, ref)
+
+
+def test_align_transcription_and_segments_use_reference_text():
+    transcriber = WhisperTranscriber()
+    reference = "Ce soir, les amis,\npréparez-vous à découvrir un mystère."
+    heard = ["ce", "soir", "euh", "les", "amies", "préparez", "vous", "a", "découvrir", "un", "mystère"]
+    transcription = [{"start": i * 0.5, "end": i * 0.5 + 0.4, "text": word} for i, word in enumerate(heard)]
+
+    corrected = transcriber.align_transcription(transcription, reference)
+    assert [w["text"] for w in corrected] == ["Ce", "soir", "les", "amis", "préparez", "vous", "à", "découvrir", "un", "mystère"]
+    assert corrected[3]["original_text"] == "amies"
+
+    segments = transcriber.extract_text_segment(reference, corrected, words_per_line=5)
+    assert [seg["text"] for seg in segments] == ["Ce soir, les amis, préparez", "vous à découvrir un mystère"]
+    assert segments[0]["start"] == 0.0
+    assert segments[-1]["end"] == transcription[-1]["end"]
@@ -1,20 +1,121 @@
 # whisper/transcript.py
-from faster_whisper import WhisperModel
 import json
-import sys
 import re
-import difflib
-from rapidfuzz import fuzz, process
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from word_alignment import ALIGNER_VERSION, WordAligner
+
+# Un seul modèle Whisper par process, partagé par toutes les parties et toutes les histoires
+_models = {}
+_pipelines = {}
+_models_lock = threading.Lock()
+
+
+def get_whisper_model(model_size="medium", device="cpu", compute_type="int8", cpu_threads=0):
+    key = (model_size, device, compute_type, cpu_threads)
+    with _models_lock:
+        if key not in _models:
+            from faster_whisper import WhisperModel
+
+            print(f"🧠 Chargement du modèle Whisper '{model_size}' ({device}, {compute_type}, threads={cpu_threads or 'auto'})")
+            _models[key] = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+        return _models[key]
+
+
+def get_batched_pipeline(model_size="medium", device="cpu", compute_type="int8", cpu_threads=0):
+    model = get_whisper_model(model_size, device, compute_type, cpu_threads)
+    key = (model_size, device, compute_type, cpu_threads)
+    with _models_lock:
+        if key not in _pipelines:
+            from faster_whisper import BatchedInferencePipeline
+
+            _pipelines[key] = BatchedInferencePipeline(model=model)
+        return _pipelines[key]
 
 
 class WhisperTranscriber:
-    def __init__(self, model_size="medium", device="cpu"):
-        self.model = WhisperModel(model_size, device=device)
+    def __init__(self, model_size="medium", device="cpu", compute_type="int8", cpu_threads=0, language=None, batch_size=8):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self.cpu_threads = cpu_threads
+        self.language = language
+        self.batch_size = batch_size
+        self.aligner = WordAligner()
+
+    @property
+    def model(self):
+        # créé à la première transcription seulement, puis réutilisé
+        return get_whisper_model(self.model_size, self.device, self.compute_type, self.cpu_threads)
+
+    @property
+    def batched_model(self):
+        return get_batched_pipeline(self.model_size, self.device, self.compute_type, self.cpu_threads)
+
+    @property
+    def model_id(self):
+        # identifie tout ce qui change le résultat d'une transcription alignée
+        return f"{self.model_size}:{self.compute_type}:{self.language}:align-v{ALIGNER_VERSION}"
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(
+            model_size=config.get("whisper_model", "medium"),
+            device=config.get("whisper_device", "cpu"),
+            compute_type=config.get("whisper_compute_type", "int8"),
+            cpu_threads=int(config.get("whisper_threads", 0) or 0),
+            language=config.get("whisper_language"),
+            batch_size=int(config.get("whisper_batch_size", 8) or 8),
+        )
 
     def transcribe_by_words(self, audio_path):
-        segments, _ = self.model.transcribe(audio_path, word_timestamps=True)
+        segments, _ = self.model.transcribe(audio_path, word_timestamps=True, language=self.language)
+        return self._words_from_segments(segments)
+
+    def transcribe_batch(self, audio_paths):
+        """
+        Transcrit plusieurs fichiers, un par un, avec le même modèle : chaque fichier est découpé par VAD et ses
+        segments sont inférés par lots (batch_size). Les lots ne mélangent pas les fichiers ; seul le décodage
+        du fichier suivant est préchargé pendant la transcription du fichier courant.
+        Un fichier illisible est signalé et absent du résultat.
+        Retourne {audio_path: [{"start", "end", "text"}, ...]}.
+        """
+        from faster_whisper.audio import decode_audio
+
+        results = {}
+        if not audio_paths:
+            return results
+
+        with ThreadPoolExecutor(max_workers=2) as decoder:
+            pending = decoder.submit(decode_audio, audio_paths[0])
+            for idx, audio_path in enumerate(audio_paths):
+                try:
+                    audio = pending.result()
+                except Exception as e:
+                    audio = None
+                    print(f"❌ Audio illisible, ignoré : {audio_path} ({e})")
+                if idx + 1 < len(audio_paths):
+                    pending = decoder.submit(decode_audio, audio_paths[idx + 1])
+                if audio is None:
+                    continue
+
+                print(f"🎧 Transcription par lots ({idx + 1}/{len(audio_paths)}) : {audio_path}")
+                segments, _ = self.batched_model.transcribe(
+                    audio,
+                    language=self.language,
+                    word_timestamps=True,
+                    vad_filter=True,
+                    batch_size=self.batch_size,
+                )
+                results[audio_path] = self._words_from_segments(segments)
+
+        return results
+
+    def _words_from_segments(self, segments):
         results = []
-        
+
         for seg in segments:
             if hasattr(seg, 'words') and seg.words:
                 for word_info in seg.words:
@@ -25,7 +126,7 @@ class WhisperTranscriber:
                     })
             else:
                 print(f"⚠️ Segment sans mots détecté entre {seg.start:.2f}s et {seg.end:.2f}s ➔ Ignoré.")
-        
+
         # print(f"✅ Transcription mot-à-mot réussie avec {len(results)} mots capturés.")
         return results
 
@@ -34,163 +135,58 @@ class WhisperTranscriber:
             json.dump(transcription, f, ensure_ascii=False, indent=2)
         print(f"✅ Transcript saved to {output_path}")
 
-    def get_corrected_word(self, word, ref_words, current_index, search_window=5, threshold=15, min_score=25):
-        search_zone = ref_words[current_index: current_index + search_window]
-        
-        # print("\n🔎 Nouveau mot à corriger :")
-        # print(f"➡️  Mot entendu      : '{word}'")
-        # print(f"➡️  Index actuel     : {current_index}")
-        # print(f"➡️  Zone de recherche: {search_zone}")
-
-        if not search_zone:
-            print("🚫 Zone de recherche vide. Retour None.")
-            return None, current_index
-
-        lowered_search_zone = [w.lower() for w in search_zone]
-        lowered_word = word.lower()
-
-        candidates = []
-        for idx, candidate_word in enumerate(lowered_search_zone):
-            sim_score = fuzz.ratio(lowered_word, candidate_word)
-            distance_penalty = idx * 15  # pénalité par distance
-            final_score = sim_score - distance_penalty
-            
-            # BONUS spécial pour "a" ou "à"
-            if lowered_word in ("a", "à") and candidate_word in ("a", "à"):
-                # print("🎯 Bonus +20 appliqué pour mot spécial 'a' ou 'à'")
-                final_score += 20
-
-            candidates.append({
-                "original_word": search_zone[idx],
-                "score": sim_score,
-                "distance_penalty": distance_penalty,
-                "final_score": final_score,
-                "relative_index": idx
-            })
-
-        candidates = sorted(candidates, key=lambda x: x["final_score"], reverse=True)
-
-        # print("\n📝 Candidats évalués :")
-        # for c in candidates:
-        #     print(f"Mot: '{c['original_word']}' | Score: {c['score']} | Pénalité: {c['distance_penalty']} | Score final: {c['final_score']}")
-
-        best = candidates[0] if candidates else None
-
-        if best and best["final_score"] >= threshold:
-            corrected_word = best["original_word"]
-            new_index = current_index + best["relative_index"] + 1
-            # print(f"\n✅ Correction acceptée : '{corrected_word}' ➔ Nouveau index: {new_index}")
-            if best["final_score"] > min_score:
-                return corrected_word, new_index
-            return corrected_word, current_index
-        else:
-            # Attention ici : on NE change PAS d'index si score insuffisant (<40)
-            print(f"\n⚠️ Score insuffisant ({best['final_score'] if best else 'N/A'}) ➔ Utilisation du mot original '{word}' (ref_index inchangé)")
-            return None, current_index
-
     def extract_text_segment(self, reference_text, corrected_data, words_per_line=5):
         clean_reference_text = reference_text.replace('\n', ' ')
 
+        # Table (début, fin) de chaque mot du texte de référence, indexée comme ref_index
+        word_offsets = [(word.start(), word.end()) for word in re.finditer(r'\w+', clean_reference_text)]
         segments = []
-        ref_words = list(re.finditer(r'\w+', clean_reference_text))
-        ref_index = 0
-        data_index = 0
-        segment_counter = 1
 
-        while data_index < len(corrected_data):
-            # Position du mot de départ
-            start_time = corrected_data[data_index]['start']
-            start_ref_word = corrected_data[data_index]['text']
-
-            # Récupérer words_per_line mots valides
+        for data_index in range(0, len(corrected_data), words_per_line):
             group = corrected_data[data_index:data_index + words_per_line]
-            if not group:
-                break
-
-            end_time = group[-1]['end']
-            end_ref_word = group[-1]['text']
-
-            # Maintenant on doit retrouver le texte exact entre les deux mots dans reference_text
-            # On cherche où se trouve start_ref_word dans ref_words
-            segment_start_pos = None
-            segment_end_pos = None
-            collected = []
 
-            # print(f"\n🧠 Nouveau groupe : '{start_ref_word}' -> '{end_ref_word}'")
-            # print("🔎 Recherche dans le texte brut...")
+            # chaque mot corrigé connaît sa position dans la référence : lecture directe des offsets
+            segment_start_pos = word_offsets[group[0]['ref_index']][0]
+            segment_end_pos = word_offsets[group[-1]['ref_index']][1]
+            segment_text = clean_reference_text[segment_start_pos:segment_end_pos]
 
-            while ref_index < len(ref_words):
-                word = ref_words[ref_index]
-                word_text = word.group(0)
-
-                # print(f"  Mot brut : '{word_text}' (index {ref_index})")
-
-                if word_text.lower() == start_ref_word.lower() and (len(word_text) == len(start_ref_word)) and segment_start_pos is None:
-                    segment_start_pos = word.start()
-                    # print(f"  🟢 Début trouvé : '{word_text}' (position {segment_start_pos})")
-
-                collected.append(word_text)
-
-                is_near_end = (data_index + words_per_line >= len(corrected_data))
-
-                if ((len(collected) >= words_per_line) or is_near_end) and (word_text.lower() == end_ref_word.lower()) and (len(word_text) == len(end_ref_word)):
-                    segment_end_pos = word.end()
-                    # print(f"  🔴 Fin trouvée : '{word_text}' (position {segment_end_pos}) avec {len(collected)} mots")
-                    ref_index += 1
-                    break
-
-                ref_index += 1
-
-            if segment_start_pos is not None and segment_end_pos is not None:
-                segment_text = clean_reference_text[segment_start_pos:segment_end_pos]
-
-                # Affichage DEBUG clair
-                # print(f"\n📋 Segment {segment_counter}:")
-                # print(f"   Texte extrait        : '{segment_text.strip()}'")
-                # print(f"   Start time            : {start_time:.2f}s (mot: '{start_ref_word}')")
-                # print(f"   End time              : {end_time:.2f}s (mot: '{end_ref_word}')")
-                # print(f"   Mots utilisés         : {[w['text'] for w in group]}")
-                # print(f"   Ref words traités     : {collected}")
-
-                segments.append({
-                    'start': start_time,
-                    'end': end_time,
-                    'text': segment_text.strip()
-                })
-            else:
-                print(f"\n⚠️ Impossible d'associer correctement '{start_ref_word}' -> '{end_ref_word}' dans le texte brut.")
-
-            data_index += words_per_line
-            segment_counter += 1
+            segments.append({
+                'start': group[0]['start'],
+                'end': group[-1]['end'],
+                'text': segment_text.strip()
+            })
 
         # print(f"\n✅ {len(segments)} segments extraits proprement.")
         return segments
 
-    
-    def process_transcription(self, audio_path, output_path, reference_txt_path, words_per_line=5):
-        transcription = self.transcribe_by_words(audio_path)
-        
-        with open(reference_txt_path, 'r', encoding='utf-8') as f:
-            reference_text = f.read()
 
+    def align_transcription(self, transcription, reference_text):
         ref_words = re.findall(r'\w+', reference_text)
         corrected_data = []
-        ref_index = 0  # L'index dans ton texte de référence
 
-        # 1. Correction mot à mot
-        for item in transcription:
+        # Alignement global de toute la transcription sur tout le texte de référence
+        alignment = self.aligner.align([item['text'] for item in transcription], ref_words)
+        for item, (ref_index, _) in zip(transcription, alignment):
             original = item['text']
-            corrected, ref_index = self.get_corrected_word(original, ref_words, ref_index)
 
-            if corrected is None:
-                # print(f"⚠️ Aucune correspondance trouvée pour : '{original}' ➔ Utilisation du texte brut.")
-                # corrected = original
+            if ref_index is None:
                 print(f"⚠️ Aucune correspondance trouvée pour : '{original}' ➔ Ignoré.")
                 continue
-            
-            item['original_text'] = original
-            item['text'] = corrected
-            corrected_data.append(item)
+
+            corrected_data.append({**item, 'original_text': original, 'text': ref_words[ref_index], 'ref_index': ref_index})
+
+        return corrected_data
+
+    def process_transcription(self, audio_path, output_path, reference_txt_path, words_per_line=5, transcription=None):
+        words_per_line = int(words_per_line)
+        if transcription is None:
+            transcription = self.transcribe_by_words(audio_path)
+
+        with open(reference_txt_path, encoding='utf-8') as f:
+            reference_text = f.read()
+
+        # 1. Correction mot à mot
+        corrected_data = self.align_transcription(transcription, reference_text)
 
         # 2. Sauvegarder mot par mot
         word_by_word_output = output_path.replace(".json", "_word_by_word.json")
@@ -204,9 +200,9 @@ class WhisperTranscriber:
         self.save_transcription(segments, output_path)
         # print(f"✅ Segments sauvegardés ici : {output_path}")
 
-def run_whisper_main(audio, output, reference_txt, words_per_line):
-    transcriber = WhisperTranscriber()
-    transcriber.process_transcription(audio, output, reference_txt, words_per_line)
+def run_whisper_main(audio, output, reference_txt, words_per_line, config=None, transcription=None):
+    transcriber = WhisperTranscriber.from_config(config or {})
+    transcriber.process_transcription(audio, output, reference_txt, words_per_line, transcription)
 
 if __name__ == "__main__":
     audio = sys.argv[1]
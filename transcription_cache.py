@@ -0,0 +1,29 @@
+from content_hash import file_sha256, params_sha256, text_sha256
+from disk_cache import DiskCache
+
+
+class TranscriptionCache:
+    """
+    Cache des transcriptions Whisper alignées, indexé par le contenu de l'audio, le texte de référence
+    et le modèle. Les mots horodatés sont stockés une fois ; le découpage en lignes est stocké à part
+    pour chaque valeur de words_per_line.
+    """
+
+    def __init__(self, root="cache/transcriptions", max_mb=200):
+        self.cache = DiskCache(root, max_bytes=int(max_mb * 1024 * 1024))
+
+    def key_for(self, wav_path, reference_text, model_id):
+        return params_sha256({"audio": file_sha256(wav_path), "reference": text_sha256(reference_text), "model": model_id})
+
+    def get_words(self, key):
+        entry = self.cache.get_json(key)
+        return entry["words"] if entry else None
+
+    def put_words(self, key, words):
+        self.cache.put_json(key, {"words": words})
+
+    def get_segments(self, key, words_per_line):
+        return self.cache.get_json(f"{key}_wpl{words_per_line}")
+
+    def put_segments(self, key, words_per_line, segments):
+        self.cache.put_json(f"{key}_wpl{words_per_line}", segments)
@@ -0,0 +1,138 @@
+import re
+import wave
+
+import numpy as np
+
+VOWEL_GROUPS = re.compile(r"[aeiouyàâäéèêëîïôöûùüœæ]+", re.IGNORECASE)
+# force de la pause attendue après un signe de ponctuation
+PUNCTUATION_STRENGTH = {".": 1.0, "!": 1.0, "?": 1.0, "…": 1.0, ";": 0.6, ":": 0.6, ",": 0.4}
+
+
+def read_wav_mono(path):
+    with wave.open(path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        sample_width = wav.getsampwidth()
+        raw = wav.readframes(wav.getnframes())
+
+    dtype = {1: np.uint8, 2: np.int16, 4: np.int32}.get(sample_width)
+    if dtype is None:
+        raise ValueError(f"Format WAV non supporté ({sample_width * 8} bits) : {path}")
+
+    samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+    if dtype is np.uint8:
+        samples -= 128.0
+    samples /= float(np.iinfo(dtype).max)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples, sample_rate
+
+
+def syllable_count(word):
+    return max(1, len(VOWEL_GROUPS.findall(word)))
+
+
+class VadSubtitleTimer:
+    """
+    Minutage des sous-titres sans Whisper : détection des zones de parole par énergie,
+    puis répartition des mots connus du texte de référence sur ces zones (poids = syllabes),
+    en calant la ponctuation sur les pauses.
+    """
+
+    def __init__(self, frame_ms=20, threshold_db=14, min_pause=0.18, min_speech=0.08, snap_window=1.5):
+        self.frame_ms = frame_ms
+        self.threshold_db = threshold_db
+        self.min_pause = min_pause
+        self.min_speech = min_speech
+        self.snap_window = snap_window
+
+    def speech_runs(self, samples, sample_rate):
+        frame = max(1, int(sample_rate * self.frame_ms / 1000))
+        n_frames = len(samples) // frame
+        if n_frames == 0:
+            return []
+
+        frames = samples[: n_frames * frame].reshape(n_frames, frame)
+        energy_db = 10 * np.log10(np.mean(frames**2, axis=1) + 1e-10)
+        noise_floor = np.percentile(energy_db, 10)
+        speech = energy_db > max(noise_floor + self.threshold_db, energy_db.max() - 50)
+
+        # début / fin de chaque zone de parole (en numéros de frame)
+        edges = np.diff(np.concatenate(([0], speech.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        frame_sec = frame / sample_rate
+
+        runs = []
+        for start, end in zip(starts * frame_sec, ends * frame_sec):
+            if runs and start - runs[-1][1] < self.min_pause:
+                runs[-1][1] = float(end)  # pause trop courte : on fusionne
+            else:
+                runs.append([float(start), float(end)])
+        return [(start, end) for start, end in runs if end - start >= self.min_speech]
+
+    def _break_strengths(self, text, words):
+        strengths = np.zeros(len(words))
+        for idx, word in enumerate(words):
+            following = text[word.end() : words[idx + 1].start()] if idx + 1 < len(words) else text[word.end() :]
+            strengths[idx] = max((PUNCTUATION_STRENGTH.get(ch, 0.0) for ch in following), default=0.0)
+        return strengths
+
+    def time_words(self, wav_path, reference_text):
+        """
+        Retourne le flux de mots [{"start", "end", "text", "ref_index"}] attendu par extract_text_segment.
+        """
+        text = reference_text.replace("\n", " ")
+        words = list(re.finditer(r"\w+", text))
+        if not words:
+            return []
+
+        samples, sample_rate = read_wav_mono(wav_path)
+        runs = self.speech_runs(samples, sample_rate)
+        if not runs:
+            runs = [(0.0, len(samples) / sample_rate)]
+
+        run_starts = np.array([start for start, _ in runs])
+        run_lengths = np.array([end - start for start, end in runs])
+        # temps de parole cumulé (pauses exclues) au début de chaque zone
+        speech_offsets = np.concatenate(([0.0], np.cumsum(run_lengths)))
+        total_speech = speech_offsets[-1]
+
+        weights = np.array([syllable_count(w.group(0)) for w in words], dtype=np.float64)
+        boundaries = np.concatenate(([0.0], np.cumsum(weights)))
+        boundaries *= total_speech / boundaries[-1]
+
+        # calage : chaque pause attire la fin de mot ponctuée la plus proche (ordre conservé)
+        strengths = self._break_strengths(text, words)
+        anchors = [(0, 0.0)]
+        for pause_time in speech_offsets[1:-1]:
+            candidates = np.arange(anchors[-1][0] + 1, len(words))
+            if len(candidates) == 0:
+                break
+            distance = np.abs(boundaries[candidates] - pause_time)
+            score = strengths[candidates - 1] - distance / self.snap_window
+            best = int(np.argmax(score))
+            if score[best] > 0:
+                anchors.append((int(candidates[best]), pause_time))
+        anchors.append((len(words), total_speech))
+
+        speech_times = np.empty(len(words) + 1)
+        for (i0, t0), (i1, t1) in zip(anchors, anchors[1:]):
+            local = np.concatenate(([0.0], np.cumsum(weights[i0:i1])))
+            speech_times[i0 : i1 + 1] = t0 + (t1 - t0) * local / max(local[-1], 1e-9)
+
+        def to_real_time(speech_time, prefer_next_run):
+            # un temps de parole tombant pile sur une pause va au début de la zone suivante (ou à la fin de la précédente)
+            side = "right" if prefer_next_run else "left"
+            run = int(np.clip(np.searchsorted(speech_offsets, speech_time, side=side) - 1, 0, len(runs) - 1))
+            return float(run_starts[run] + (speech_time - speech_offsets[run]))
+
+        return [
+            {
+                "start": round(to_real_time(speech_times[idx], True), 3),
+                "end": round(to_real_time(speech_times[idx + 1], False), 3),
+                "text": word.group(0),
+                "ref_index": idx,
+            }
+            for idx, word in enumerate(words)
+        ]
@@ -1,94 +1,130 @@
 import os
-import random
 import re
-import time
+import tempfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-import cv2
-import numpy as np
 import yaml
+from databases.media_index_database import MediaIndexDatabase
 from databases.story_database import StoryDatabase
-from moviepy.audio.fx import AudioLoop
-from moviepy import (
-    AudioFileClip,
-    ColorClip,
-    CompositeAudioClip,
-    VideoFileClip,
-    concatenate_videoclips,
-)
-from subtitle_generator import SubtitleGenerator
-from tqdm import tqdm
+from ffmpeg_renderer import FFmpegRenderer
+from ken_burns import PAN_MOVES, KenBurnsMotion
+from render_cache import RenderCache
+from subtitle_generator import SubtitleGenerator, SubtitleWriter
+
+# à incrémenter quand le rendu change, pour invalider les parties déjà en cache
+RENDER_VERSION = 2
+# part : incrustés dans chaque partie / final : une seule incrustation après concaténation / soft : piste activable
+SUBTITLE_MODES = ("part", "final", "soft")
+
+
+class PartRenderer:
+    """
+    Rendu d'une partie : animation Ken Burns, audio et sous-titres incrustés en un seul encodage.
+    C'est tout ce qu'un process de rendu construit (ni base, ni Whisper).
+    """
+
+    def __init__(self, config, subtitle_writer=None):
+        self.renderer = FFmpegRenderer(fps=24)
+        self.subtitle_writer = subtitle_writer or SubtitleWriter()
+        self.zoom_factor = 1.5
+        self.max_speed_px_per_sec = 75
+        self.camera_moves = config.get("camera_moves") or list(PAN_MOVES)
+
+    def render_part(self, image_path, audio_path, json_subs_path, output_path, duration, black_gap=1.0, seed=None):
+        fps = self.renderer.fps
+        motion = KenBurnsMotion(image_path, zoom_factor=self.zoom_factor, max_speed_px_per_sec=self.max_speed_px_per_sec)
+        frames = motion.frames(duration, fps, seed=seed, moves=self.camera_moves)
+
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".ass") as tmp_ass:
+            ass_path = tmp_ass.name
+        try:
+            # sans json, les sous-titres sont ajoutés une seule fois sur la vidéo finale
+            has_subs = bool(json_subs_path) and self.subtitle_writer.write_ass_file(json_subs_path, ass_path)
+            self.renderer.render_part(
+                frames,
+                motion.size,
+                audio_path,
+                output_path,
+                frame_count=int(duration * fps),
+                ass_path=ass_path if has_subs else None,
+                black_gap=black_gap,
+            )
+        finally:
+            os.remove(ass_path)
+
+    def render_job(self, job):
+        duration = job["duration"]
+
+        # animation + audio + fondus + noir (+ sous-titres en mode part) en un seul encodage
+        self.render_part(
+            job["image_path"], job["audio_path"], job["json_path"], job["output_path"], duration, job["black_gap"], job["seed"]
+        )
+        return job["output_path"]
 
 
 class VideoStoryBuilder:
-    def __init__(self, config_path="config.yaml"):
-        self.story_db = StoryDatabase()
-        self.subtitle_gen = SubtitleGenerator()
-
-        try:
-            with open(config_path, encoding="utf-8") as f:
-                self.config = yaml.safe_load(f)
-        except FileNotFoundError:
-            print(f"❌ Fichier config introuvable : {config_path}")
-            self.config = {}
-
-    def random_pan_zoom(self, image_path, output_path, zoom_factor=1.5, duration=5, fps=30, max_speed_px_per_sec=None):
-        img = cv2.imread(image_path)
-        height, width = img.shape[:2]
-        zoomed = cv2.resize(img, None, fx=zoom_factor, fy=zoom_factor, interpolation=cv2.INTER_LINEAR)
-        zh, zw = zoomed.shape[:2]
-
-        direction = random.choice(["up", "down", "left", "right"])
-        total_frames = int(duration * fps)
-
-        if direction == "up":
-            x, y = (zw - width) // 2, zh - height
-            dx_total, dy_total = 0, -(zh - height)
-        elif direction == "down":
-            x, y = (zw - width) // 2, 0
-            dx_total, dy_total = 0, (zh - height)
-        elif direction == "left":
-            x, y = zw - width, (zh - height) // 2
-            dx_total, dy_total = -(zw - width), 0
+    def __init__(self, config_path="config.yaml", config=None, story_db=None, subtitle_gen=None, media_index=None):
+        self.config_path = config_path
+        self.story_db = story_db or StoryDatabase()
+        self.media_index = media_index or MediaIndexDatabase()
+        self.subtitle_gen = subtitle_gen or SubtitleGenerator(config=config, story_db=self.story_db)
+
+        if config is not None:
+            self.config = config
         else:
-            x, y = 0, (zh - height) // 2
-            dx_total, dy_total = (zw - width), 0
-
-        # Limitation de la vitesse maximale (si demandé)
-        if max_speed_px_per_sec is not None:
-            total_distance = np.sqrt(dx_total**2 + dy_total**2)
-            max_total_distance = max_speed_px_per_sec * duration
-            if total_distance > max_total_distance:
-                scale = max_total_distance / total_distance
-                dx_total *= scale
-                dy_total *= scale
-
-        dx = dx_total / total_frames
-        dy = dy_total / total_frames
-
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(output_path, fourcc, fps, (width, height))
-
-        for _ in tqdm(range(total_frames), desc="Animation"):
-            frame = zoomed[int(y) : int(y) + height, int(x) : int(x) + width]
-            out.write(frame)
-            x, y = x + dx, y + dy
-
-        out.release()
-        time.sleep(1)
-
-    def make_animated_clip(self, image_path, duration, temp_out="temp_animation.mp4"):
-        self.random_pan_zoom(image_path, temp_out, duration=duration, fps=24, max_speed_px_per_sec=75)
-        return VideoFileClip(temp_out)
+            try:
+                with open(config_path, encoding="utf-8") as f:
+                    self.config = yaml.safe_load(f)
+            except FileNotFoundError:
+                print(f"❌ Fichier config introuvable : {config_path}")
+                self.config = {}
+
+        self.part_renderer = PartRenderer(self.config, self.subtitle_gen)
+        self.renderer = self.part_renderer.renderer
+        self.subtitle_mode = self.config.get("subtitle_mode", "part")
+        if self.subtitle_mode not in SUBTITLE_MODES:
+            raise ValueError(f"❌ subtitle_mode inconnu : {self.subtitle_mode} (attendu : {', '.join(SUBTITLE_MODES)})")
 
     def concat_video_parts(self, folder_path, output_path):
-        files = sorted([f for f in os.listdir(folder_path) if f.endswith(".mp4")], key=self._natural_sort)
+        files = sorted(
+            [f for f in os.listdir(folder_path) if f.endswith(".mp4") and not f.endswith(".part.mp4")], key=self._natural_sort
+        )
         if not files:
             raise ValueError("❌ Aucun fichier .mp4 trouvé.")
 
-        clips = [VideoFileClip(os.path.join(folder_path, f)) for f in files]
-        final = concatenate_videoclips(clips, method="compose")
-        final.write_videofile(output_path, fps=24, codec="libx264", audio_codec="aac")
+        paths = [os.path.join(folder_path, f) for f in files]
+        self.renderer.concat_copy(paths, output_path)
         print(f"✅ Exporté : {output_path}")
+        return paths
+
+    def add_story_subtitles(self, part_paths, sound_folder, output_path):
+        """
+        Compile la piste de sous-titres de toute l'histoire (décalée de la durée réelle de chaque partie,
+        noir de fin compris), toujours écrite à côté de la vidéo, puis l'incruste ou l'ajoute selon subtitle_mode.
+        """
+        entries = []
+        offset = 0.0
+        for path in part_paths:
+            epc = os.path.splitext(os.path.basename(path))[0]
+            entries.append((os.path.join(sound_folder, f"{epc}.json"), offset))
+            offset += self.renderer.duration(path)
+
+        story_folder = os.path.dirname(output_path)
+        ass_path = os.path.join(story_folder, "subtitles.ass")
+        srt_path = os.path.join(story_folder, "subtitles.srt")
+        line_count = self.subtitle_gen.write_story_subtitles(entries, ass_path, srt_path)
+        if self.subtitle_mode == "part" or line_count == 0:
+            return
+
+        tmp_output = f"{os.path.splitext(output_path)[0]}.subs.mp4"
+        if self.subtitle_mode == "final":
+            print("🔥 Incrustation des sous-titres sur la vidéo finale...")
+            self.renderer.burn_subtitles(output_path, ass_path, tmp_output)
+        else:
+            print("💬 Ajout de la piste de sous-titres (sans ré-encodage)...")
+            self.renderer.mux_subtitles(output_path, srt_path, tmp_output)
+        os.replace(tmp_output, output_path)
 
     def generate_story_video(self, img_folder, sound_folder, video_parts_folder, title, output_path):
         # make subtitles
@@ -96,82 +132,142 @@ class VideoStoryBuilder:
         # generate videos
         parts = self.story_db.get_story_parts(title)
         print(f"🎞️ Génération vidéo pour : {title} ({len(parts)} parties)")
+        # images et durées audio lues dans l'index (en-têtes seulement, relus si le fichier a changé)
+        self.media_index.refresh(img_folder)
+        self.media_index.refresh(sound_folder)
+        images = self.media_index.images_by_stem(img_folder)
+        audios = self.media_index.audio_by_stem(sound_folder)
+
+        cache = RenderCache(video_parts_folder, hasher=self.media_index.sha256)
+        jobs = []
         for idx, part in enumerate(parts):
             epc = part["epc"]
-            img = os.path.join(img_folder, f"{epc}.png")
-            audio = os.path.join(sound_folder, f"{epc}.wav")
+            img = images.get(epc)
+            audio_entry = audios.get(epc)
             part_video = os.path.join(video_parts_folder, f"{epc}.mp4")
 
-            # Si l'image .png n'existe pas, on tente avec .jpg
-            if not os.path.exists(img):
-                alt_img = os.path.join(img_folder, f"{epc}.jpg")
-                if os.path.exists(alt_img):
-                    img = alt_img  # on utilise l’image jpg à la place
-                else:
-                    print(f"⚠️ Fichiers manquants pour epc: {epc}")
-                    print(f"   ❌ Image manquante : {img} et {alt_img}")
-                    if not os.path.exists(audio):
-                        print(f"   ❌ Audio manquant : {audio}")
-                    continue
+            # l'index préfère le .png, puis le .jpg
+            if img is None:
+                print(f"⚠️ Fichiers manquants pour epc: {epc}")
+                print(f"   ❌ Image manquante : {os.path.join(img_folder, epc)}.png / .jpg")
+                if audio_entry is None:
+                    print(f"   ❌ Audio manquant : {os.path.join(sound_folder, epc)}.wav")
+                continue
 
             # Vérifie maintenant l'audio
-            if not os.path.exists(audio):
+            if audio_entry is None:
                 print(f"⚠️ Fichier audio manquant pour epc: {epc}")
-                print(f"   ❌ Audio manquant : {audio}")
+                print(f"   ❌ Audio manquant : {os.path.join(sound_folder, epc)}.wav")
                 continue
+            audio = audio_entry["path"]
 
-            audio_clip = AudioFileClip(audio)
-            # Générer l'animation sans audio et l'enregistrer
             # make_short = self.config.get("short", False)
-            if not os.path.exists(part_video):
-                clip = self.make_animated_clip(img, audio_clip.duration)
-                animated = clip.set_audio(audio_clip).fadein(1).fadeout(1)
-
-                if idx < len(parts) - 1:
-                    black = ColorClip(size=animated.size, color=(0, 0, 0), duration=1).fadein(0.5).fadeout(0.5)
-                    animated = concatenate_videoclips([animated, black], method="compose")
+            json_path = os.path.join(sound_folder, f"{epc}.json") if self.subtitle_mode == "part" else None
+            black_gap = 1.0 if idx < len(parts) - 1 else 0.0
+            seed = zlib.crc32(epc.encode("utf-8"))
+            key = cache.key_for(img, audio, json_path, self.render_params(black_gap, seed))
 
-                animated.write_videofile(part_video, fps=24, codec="libx264", audio=True)
-                time.sleep(1)
-                clip.close()
+            if cache.is_fresh(epc, key):
+                print(f"📂 Déjà à jour : {epc}")
+                continue
 
-                json_path = os.path.join(sound_folder, f"{epc}.json")
-                final_subtitled = os.path.join(video_parts_folder, f"{epc}_subtitled.mp4")
-                self.subtitle_gen.burn_subtitles_on_video_from_json(part_video, json_path, final_subtitled)
-                os.replace(final_subtitled, part_video)
-            else:
-                print(f"📂 Déjà existant : {epc}")
+            jobs.append(
+                {
+                    "epc": epc,
+                    "image_path": img,
+                    "audio_path": audio,
+                    "duration": audio_entry["duration"],
+                    "json_path": json_path,
+                    "output_path": part_video,
+                    "black_gap": black_gap,
+                    "seed": seed,
+                    "camera_moves": self.part_renderer.camera_moves,
+                    "cache_key": key,
+                }
+            )
+
+        cache.evict_stale({part["epc"] for part in parts})
+        for job in jobs:
+            cache.invalidate(job["epc"])
+
+        # chaque partie est enregistrée dès qu'elle est rendue : un échec ne fait pas refaire les autres
+        self.render_jobs(jobs, on_done=lambda job: cache.store(job["epc"], job["cache_key"]))
+
+        part_paths = self.concat_video_parts(video_parts_folder, output_path)
+        self.add_story_subtitles(part_paths, sound_folder, output_path)
+
+    def render_params(self, black_gap, seed):
+        # tout ce qui change l'image ou le son d'une partie doit être dans la clé du cache
+        return {
+            "version": RENDER_VERSION,
+            "fps": self.renderer.fps,
+            "zoom_factor": self.part_renderer.zoom_factor,
+            "max_speed_px_per_sec": self.part_renderer.max_speed_px_per_sec,
+            "seed": seed,
+            "camera_moves": self.part_renderer.camera_moves,
+            "black_gap": black_gap,
+            "crf": self.renderer.crf,
+            "preset": self.renderer.preset,
+            "audio_bitrate": self.renderer.audio_bitrate,
+            "burn_subtitles": self.subtitle_mode == "part",
+        }
+
+    def render_jobs(self, jobs, on_done=None):
+        workers = min(int(self.config.get("render_workers", 1) or 1), len(jobs))
+        if workers <= 1:
+            results = []
+            for job in jobs:
+                results.append(self.part_renderer.render_job(job))
+                if on_done:
+                    on_done(job)
+            return results
+
+        # chaque process a son propre moteur de rendu, ses fichiers temporaires et une part des coeurs pour x264
+        ffmpeg_threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"🧵 Rendu parallèle de {len(jobs)} parties sur {workers} process ({ffmpeg_threads} threads ffmpeg chacun)")
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_render_worker, initargs=(self.config, ffmpeg_threads)
+        ) as executor:
+            futures = {executor.submit(_render_job_in_worker, job): job for job in jobs}
+            errors = []
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Échec du rendu : {job['epc']} ({e})")
+                    errors.append(e)
+                    continue
+                if on_done:
+                    on_done(job)
 
-        self.concat_video_parts(video_parts_folder, output_path)
+        if errors:
+            raise errors[0]
+        return [job["output_path"] for job in jobs]
 
     def add_background_music(self, video_path, music_path, output_path="final_with_music.mp4", music_volume=0.16):
         print("🎶 Ajout musique d’ambiance...")
-        video = VideoFileClip(video_path)
-        original_audio = video.audio
-        music = AudioFileClip(music_path)
-
-        # Boucle la musique si elle est trop courte
-        if music.duration < video.duration:
-            music = AudioLoop(music, duration=video.duration)
-        music = music.volumex(music_volume)
-
-        combined_audio = CompositeAudioClip([music.set_duration(video.duration), original_audio])
-        final = video.set_audio(combined_audio)
-        final.write_videofile(output_path, codec="libx264", audio_codec="aac")
+        # la musique est bouclée par ffmpeg et coupée à la durée de la vidéo
+        self.renderer.mix_music(video_path, music_path, output_path, music_volume)
         print(f"✅ Vidéo finale avec musique : {output_path}")
 
     def _natural_sort(self, s):
         return [int(t) if t.isdigit() else t.lower() for t in re.split(r"([0-9]+)", s)]
 
 
-# if __name__ == "__main__":
-#     builder = VideoStoryBuilder()
-#     builder.random_pan_zoom(
-#         image_path="histoire/coccinelle/img/lili_la_coccinelle_et_le_grand_voyage_56.png",
-#         output_path="test_video.mp4",
-#         duration=20,
-#         max_speed_px_per_sec=75
-#     )
+_worker_renderer = None
+
+
+def _init_render_worker(config, ffmpeg_threads):
+    global _worker_renderer
+    # config déjà résolue par le process principal (AppContext compris) : rien n'est relu depuis le disque
+    _worker_renderer = PartRenderer(config)
+    _worker_renderer.renderer.threads = ffmpeg_threads
+
+
+def _render_job_in_worker(job):
+    print(f"🎬 [{os.getpid()}] Rendu : {job['epc']}")
+    return _worker_renderer.render_job(job)
 
 
 # if __name__ == "__main__":
@@ -1,25 +1,51 @@
+import json
 import os
+import time
+import wave
 
-import torch
 import yaml
+from content_hash import file_sha256
 from databases.story_database import StoryDatabase
-from pydub import AudioSegment
-from torch import serialization
-from TTS.api import TTS
-from TTS.config.shared_configs import BaseDatasetConfig
-from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import XttsArgs, XttsAudioConfig
+from speaker_latents import SpeakerLatentCache
+from speech_cache import SpeechCache
+from wav_stream import WavStreamWriter, concat_wavs, float_to_pcm16
 
-# Whitelist pour torch
-serialization.add_safe_globals([XttsConfig, XttsAudioConfig, BaseDatasetConfig, XttsArgs])
+XTTS_MODEL = "tts_models/multilingual/multi-dataset/xtts_v2"
+# à incrémenter quand la synthèse change, pour invalider l'audio déjà en cache
+SPEECH_VERSION = 3
+# silence inséré entre deux phrases, comme le fait Synthesizer.tts de coqui
+SENTENCE_GAP_SAMPLES = 10000
+# fréquence de sortie de xtts_v2 (XttsAudioConfig.output_sample_rate) : connue sans charger le modèle
+XTTS_SAMPLE_RATE = 24000
+
+
+def load_xtts(device):
+    # torch et coqui ne sont importés qu'au premier besoin du modèle (merge_voices n'en a pas besoin)
+    from torch import serialization
+    from TTS.api import TTS
+    from TTS.config.shared_configs import BaseDatasetConfig
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import XttsArgs, XttsAudioConfig
+
+    # Whitelist pour torch
+    serialization.add_safe_globals([XttsConfig, XttsAudioConfig, BaseDatasetConfig, XttsArgs])
+    return TTS(XTTS_MODEL).to(device)
 
 
 class VoiceGenerator:
-    def __init__(self, config_path="config.yaml"):
-        self.story_db = StoryDatabase()
-        self.config = self._load_config(config_path)
+    def __init__(self, config_path="config.yaml", config=None, story_db=None):
+        self.story_db = story_db or StoryDatabase()
+        self.config = config if config is not None else self._load_config(config_path)
         self.story_base_path = self.config["base_story_dir"]
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.language = "fr"
+        self.speaker_latents = SpeakerLatentCache(self.config.get("speaker_latents_cache_dir", "cache/speaker_latents"))
+        self.speech_cache = SpeechCache(
+            self.config.get("speech_cache_dir", "cache/speech"), self.config.get("speech_cache_max_mb", 500)
+        )
+        self.model_id = f"{XTTS_MODEL}:v{SPEECH_VERSION}"
+        self._voice_hashes = {}
+        # threads torch (None = réglage par défaut de torch, tous les coeurs)
+        self.torch_threads = None
         # self.tts = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(self.device)
 
     def _load_config(self, config_path):
@@ -28,14 +54,96 @@ class VoiceGenerator:
         with open(config_path, encoding="utf-8") as f:
             return yaml.safe_load(f)
 
+    @property
+    def device(self):
+        if not hasattr(self, "_device"):
+            import torch
+
+            self._device = "cuda" if torch.cuda.is_available() else "cpu"
+        return self._device
+
     @property
     def tts(self):
         if not hasattr(self, "_tts"):
-            self._tts = TTS("tts_models/multilingual/multi-dataset/xtts_v2").to(self.device)
+            import torch
+
+            if self.device == "cpu" and self.torch_threads:
+                torch.set_num_threads(self.torch_threads)
+            self._tts = load_xtts(self.device)
         return self._tts
 
+    @property
+    def xtts(self):
+        return self.tts.synthesizer.tts_model
+
+    @property
+    def segmenter(self):
+        # même découpage que Synthesizer.split_into_sentences de coqui (pysbd, "en") : mêmes phrases, mêmes clés de cache
+        if not hasattr(self, "_segmenter"):
+            import pysbd
+
+            self._segmenter = pysbd.Segmenter(language="en", clean=True)
+        return self._segmenter
+
+    def _synthesize_sentence(self, sentence, latents):
+        gpt_cond_latent, speaker_embedding = latents
+        config = self.xtts.config
+        start = time.perf_counter()
+        out = self.xtts.inference(
+            sentence,
+            self.language,
+            gpt_cond_latent,
+            speaker_embedding,
+            temperature=config.temperature,
+            length_penalty=config.length_penalty,
+            repetition_penalty=config.repetition_penalty,
+            top_k=config.top_k,
+            top_p=config.top_p,
+        )
+        wav = out["wav"]
+        if hasattr(wav, "cpu"):
+            wav = wav.squeeze().cpu().numpy()
+        return wav, time.perf_counter() - start
+
+    def _voice_hash(self, speaker_path):
+        if speaker_path not in self._voice_hashes:
+            self._voice_hashes[speaker_path] = file_sha256(speaker_path)
+        return self._voice_hashes[speaker_path]
+
+    def speech_key(self, text, speaker_path):
+        return self.speech_cache.key_for(text, self._voice_hash(speaker_path), self.language, self.model_id)
+
     def _tts_to_file(self, text, speaker_path, output_path):
-        self.tts.tts_to_file(text=text, speaker_wav=speaker_path, language="fr", file_path=output_path)
+        """
+        Synthèse phrase par phrase : les phrases déjà en cache sont relues, les autres passent dans XTTS une à une
+        (le modèle n'est pas thread-safe, le parallélisme vient de VoiceWorkerPool). Chaque phrase est convertie
+        en PCM avec un gain fixe, puis écrite dans le WAV au fur et à mesure, dans l'ordre du texte.
+        XTTS n'est chargé qu'à la première phrase absente du cache : une partie déjà en cache ne le charge pas.
+        """
+        sentences = [s for s in self.segmenter.segment(text) if s.strip()]
+        keys = [self.speech_key(sentence, speaker_path) for sentence in sentences]
+        cached = sum(self.speech_cache.contains(key) for key in keys)
+        print(f"   💾 {cached}/{len(sentences)} phrases déjà en cache")
+
+        sample_rate = XTTS_SAMPLE_RATE
+        latencies = []
+        with WavStreamWriter(output_path, sample_rate) as writer:
+            for idx, (sentence, key) in enumerate(zip(sentences, keys)):
+                pcm = self.speech_cache.get_pcm(key)
+                if pcm is None:
+                    latents = self.speaker_latents.get(self.xtts, speaker_path)
+                    wav, latency = self._synthesize_sentence(sentence, latents)
+                    pcm = float_to_pcm16(wav)
+                    self.speech_cache.put_pcm(key, pcm)
+                    latencies.append(latency)
+                    print(f"   🗣️ Phrase {idx + 1}/{len(sentences)} : {latency:.2f}s pour {len(wav) / sample_rate:.2f}s d'audio")
+                if idx > 0:
+                    writer.write_silence(SENTENCE_GAP_SAMPLES)
+                writer.write_frames(pcm)
+
+        if latencies:
+            print(f"⏱️ Latence moyenne par phrase : {sum(latencies) / len(latencies):.2f}s")
+        return latencies
 
     def _get_voice_path(self, personnage):
         return f"assets/voices/personnages/{personnage}.wav"
@@ -57,48 +165,112 @@ class VoiceGenerator:
         outro = content.split("Outro :", 1)[1].strip()
         return intro, outro
 
-    def create_voices_for_story(self, story_folder, title, personnage="elisa"):
-        print(f"🎙️ Création des voix pour : {title}")
+    def _voice_manifest_path(self, story_folder):
+        return os.path.join(self.story_base_path, story_folder, "voice", ".voice_manifest.json")
+
+    def _load_voice_manifest(self, story_folder):
+        path = self._voice_manifest_path(story_folder)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Manifeste des voix illisible, il sera reconstruit : {path}")
+            return {}
+
+    def _save_voice_manifest(self, story_folder, manifest):
+        path = self._voice_manifest_path(story_folder)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def collect_voice_jobs(self, story_folder, title, personnage="elisa"):
         story_parts = self.story_db.get_story_parts(title)
-        print(f"🔍 {len(story_parts)} parties détectées.")
+        print(f"🔍 {title} : {len(story_parts)} parties détectées.")
         intro, outro = self._get_intro_outro(story_folder)
+        speaker_path = self._get_voice_path(personnage)
+        manifest = self._load_voice_manifest(story_folder)
 
+        jobs = []
         for i, part in enumerate(story_parts):
             epc = part["epc"]
             voice_path = os.path.join(self.story_base_path, story_folder, "voice", f"{epc}.wav")
 
-            if os.path.exists(voice_path):
-                print(f"⏭️ Skipped (déjà existant) : {epc}")
-                continue
-
             text = part["text_part"]
             if i == 0:
                 text = intro + "\n" + text
             if i == len(story_parts) - 1:
                 text = text + "\n" + outro
 
-            self._read_by_character(voice_path, text, personnage)
+            key = self.speech_key(text, speaker_path) if os.path.exists(speaker_path) else None
+            if os.path.exists(voice_path):
+                # un WAV sans entrée dans le manifeste (ancienne version) est gardé tel quel
+                if manifest.get(epc) in (None, key):
+                    manifest[epc] = key
+                    print(f"⏭️ Skipped (déjà existant) : {epc}")
+                    continue
+                print(f"✏️ Texte ou voix modifiés, régénération : {epc}")
+
+            jobs.append(
+                {
+                    "story": title,
+                    "story_folder": story_folder,
+                    "epc": epc,
+                    "text": text,
+                    "personnage": personnage,
+                    "output_path": voice_path,
+                    "voice_key": key,
+                }
+            )
+
+        self._save_voice_manifest(story_folder, manifest)
+        return jobs
+
+    def record_voice_jobs(self, jobs):
+        # appelé dans le process principal une fois les WAV écrits (les workers ne touchent pas au manifeste)
+        stories = {}
+        for job in jobs:
+            stories.setdefault(job["story_folder"], []).append(job)
+        for story_folder, story_jobs in stories.items():
+            manifest = self._load_voice_manifest(story_folder)
+            manifest.update({job["epc"]: job["voice_key"] for job in story_jobs})
+            self._save_voice_manifest(story_folder, manifest)
+
+    def synthesize_job(self, job):
+        start = time.perf_counter()
+        self._read_by_character(job["output_path"], job["text"], job["personnage"])
+        elapsed = time.perf_counter() - start
+        with wave.open(job["output_path"], "rb") as wav:
+            audio_sec = wav.getnframes() / wav.getframerate()
+        return {"epc": job["epc"], "output_path": job["output_path"], "elapsed": elapsed, "audio_sec": audio_sec}
+
+    def create_voices_for_story(self, story_folder, title, personnage="elisa"):
+        print(f"🎙️ Création des voix pour : {title}")
+        jobs = self.collect_voice_jobs(story_folder, title, personnage)
+        for job in jobs:
+            self.synthesize_job(job)
+        self.record_voice_jobs(jobs)
 
     def merge_voices(self, story_folder, title):
         story_parts = self.story_db.get_story_parts(title)
-        silence = AudioSegment.silent(duration=1000)
-        final_audio = AudioSegment.empty()
-        total_duration_sec = 0
-
         output_path = os.path.join(self.story_base_path, story_folder, "complete_sound.wav")
 
+        epcs, audio_paths = [], []
         for part in story_parts:
             epc = part["epc"]
             audio_path = os.path.join(self.story_base_path, story_folder, "voice", f"{epc}.wav")
             if os.path.exists(audio_path):
-                audio = AudioSegment.from_wav(audio_path)
-                final_audio += audio + silence
-                duration = len(audio) / 1000
-                total_duration_sec += duration
-                self.story_db.update_reading_time(epc, int(duration))
+                epcs.append(epc)
+                audio_paths.append(audio_path)
             else:
                 print(f"⚠️ Audio manquant pour : {epc}")
 
-        final_audio.export(output_path, format="wav")
+        # copie en flux, 1 seconde de silence après chaque partie
+        durations = concat_wavs(audio_paths, output_path, gap_sec=1.0)
+        self.story_db.update_reading_times([(epc, int(duration)) for epc, duration in zip(epcs, durations)])
+
         print(f"\n✅ Fichier final exporté : {output_path}")
-        print(f"🕒 Durée approx. (hors silences) : {total_duration_sec} sec")
+        print(f"🕒 Durée approx. (hors silences) : {sum(durations)} sec")
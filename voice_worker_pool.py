@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import yaml
+
+
+class VoiceWorkerPool:
+    """
+    Pool de process TTS : chaque process charge XTTS une seule fois avec un nombre de threads torch fixé,
+    puis prend les parties (de toutes les histoires) dans une file commune. Les WAV sont écrits de façon atomique.
+    """
+
+    def __init__(self, workers=None, config_path="config.yaml"):
+        self.config_path = config_path
+        if workers is None:
+            try:
+                with open(config_path, encoding="utf-8") as f:
+                    config = yaml.safe_load(f) or {}
+            except FileNotFoundError:
+                print(f"❌ Fichier config introuvable : {config_path}")
+                config = {}
+            workers = int(config.get("voice_workers", 1) or 1)
+        self.workers = max(1, workers)
+
+    def torch_threads(self, workers):
+        return max(1, (os.cpu_count() or 1) // workers)
+
+    def run(self, jobs, generator=None):
+        """
+        Synthétise toutes les parties et retourne leurs statistiques ({"epc", "output_path", "elapsed", "audio_sec"}).
+        """
+        if not jobs:
+            return []
+
+        # les parties les plus longues d'abord, pour que les process finissent à peu près ensemble
+        jobs = sorted(jobs, key=lambda job: len(job["text"]), reverse=True)
+        workers = min(self.workers, len(jobs))
+        start = time.perf_counter()
+
+        if workers <= 1:
+            if generator is None:
+                from voice_generator import VoiceGenerator
+
+                generator = VoiceGenerator(self.config_path)
+            results = [generator.synthesize_job(job) for job in jobs]
+        else:
+            threads = self.torch_threads(workers)
+            print(f"🧵 Synthèse de {len(jobs)} parties sur {workers} process ({threads} threads torch chacun)")
+            # spawn : torch et fork ne font pas bon ménage
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_voice_worker,
+                initargs=(self.config_path, threads),
+            ) as executor:
+                futures = [executor.submit(_synthesize_in_worker, job) for job in jobs]
+                results = []
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    print(f"✅ [{len(results)}/{len(jobs)}] {result['epc']} (RTF {self.rtf(result):.2f})")
+
+        wall = time.perf_counter() - start
+        audio_sec = sum(result["audio_sec"] for result in results)
+        print(f"⏱️ {len(results)} parties, {audio_sec:.1f}s d'audio en {wall:.1f}s (RTF global {wall / max(audio_sec, 1e-9):.2f})")
+        return results
+
+    @staticmethod
+    def rtf(result):
+        # real-time factor : temps de calcul / durée d'audio produite (< 1 = plus rapide que le temps réel)
+        return result["elapsed"] / max(result["audio_sec"], 1e-9)
+
+
+_worker_generator = None
+
+
+def _init_voice_worker(config_path, torch_threads):
+    global _worker_generator
+    from voice_generator import VoiceGenerator
+
+    _worker_generator = VoiceGenerator(config_path)
+    # le parallélisme vient des process : threads torch fixés pour partager les coeurs
+    _worker_generator.torch_threads = torch_threads
+    # le modèle est chargé à la première phrase absente du cache, puis gardé par le process
+
+
+def _synthesize_in_worker(job):
+    print(f"🎙️ [{os.getpid()}] {job['story']} : {job['epc']}")
+    return _worker_generator.synthesize_job(job)
@@ -0,0 +1,78 @@
+import os
+import wave
+
+import numpy as np
+
+
+def float_to_pcm16(samples):
+    # gain fixe (sortie XTTS dans [-1, 1]) : pas de normalisation par morceau, le volume reste le même d'une phrase à l'autre
+    samples = np.asarray(samples, dtype=np.float32)
+    return np.clip(samples * 32767, -32768, 32767).astype("<i2").tobytes()
+
+
+class WavStreamWriter:
+    """
+    Écriture d'un WAV PCM 16 bits au fil de l'eau : les échantillons sont ajoutés morceau par morceau,
+    dans un fichier temporaire renommé seulement quand tout s'est bien passé.
+    """
+
+    def __init__(self, path, sample_rate, channels=1, sample_width=2):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.tmp_path = f"{path}.tmp"
+        self.frames_written = 0
+        self._wav = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._wav = wave.open(self.tmp_path, "wb")
+        self._wav.setnchannels(self.channels)
+        self._wav.setsampwidth(self.sample_width)
+        self._wav.setframerate(self.sample_rate)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._wav.close()
+        if exc_type is None:
+            os.replace(self.tmp_path, self.path)
+        elif os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        return False
+
+    @property
+    def duration(self):
+        return self.frames_written / self.sample_rate
+
+    def write_frames(self, data):
+        self._wav.writeframesraw(data)
+        self.frames_written += len(data) // (self.sample_width * self.channels)
+
+    def write_silence(self, frame_count):
+        self.write_frames(bytes(frame_count * self.sample_width * self.channels))
+
+
+def concat_wavs(paths, output_path, gap_sec=1.0, chunk_frames=65536):
+    """
+    Concatène des WAV en flux (en-tête lu, frames copiées par blocs), avec gap_sec de silence après chaque fichier.
+    Retourne la durée de chaque fichier, dans l'ordre. Tous les fichiers doivent avoir le même format.
+    """
+    if not paths:
+        raise ValueError("❌ Aucun WAV à concaténer.")
+
+    with wave.open(paths[0], "rb") as first:
+        params = (first.getnchannels(), first.getsampwidth(), first.getframerate())
+    channels, sample_width, sample_rate = params
+
+    durations = []
+    with WavStreamWriter(output_path, sample_rate, channels, sample_width) as writer:
+        for path in paths:
+            with wave.open(path, "rb") as wav:
+                if (wav.getnchannels(), wav.getsampwidth(), wav.getframerate()) != params:
+                    raise ValueError(f"❌ Format WAV différent des autres parties : {path}")
+                while data := wav.readframes(chunk_frames):
+                    writer.write_frames(data)
+                durations.append(wav.getnframes() / sample_rate)
+            writer.write_silence(int(gap_sec * sample_rate))
+    return durations
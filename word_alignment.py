@@ -0,0 +1,134 @@
+import numpy as np
+from rapidfuzz import fuzz
+from rapidfuzz.process import cdist
+from rapidfuzz.utils import default_process
+
+# à incrémenter quand l'alignement change, pour invalider les transcriptions en cache
+ALIGNER_VERSION = 2
+
+# "a" et "à" sont souvent confondus par Whisper : on les considère comme équivalents
+SHORT_A = ("a", "à")
+
+
+class WordAligner:
+    """
+    Alignement global (programmation dynamique en bande) entre les mots entendus par Whisper
+    et les mots du texte de référence. Les scores de similarité sont calculés par blocs avec cdist.
+    La bande a une largeur fixe autour de la diagonale ; elle n'est doublée que si le meilleur chemin touche son bord.
+    """
+
+    def __init__(self, band=64, match_offset=50, gap_heard=-10, gap_ref=-10, short_a_bonus=80, block_size=64):
+        self.band = band
+        self.match_offset = match_offset
+        self.gap_heard = gap_heard
+        self.gap_ref = gap_ref
+        self.short_a_bonus = short_a_bonus
+        self.block_size = block_size
+
+    def _bands(self, n, m, width):
+        # les centres suivent déjà la diagonale n → m : la largeur ne dépend pas de l'écart de longueur
+        centers = np.rint(np.arange(n + 1) * (m / max(n, 1))).astype(np.int64)
+        lows = np.clip(centers - width, 0, m)
+        highs = np.clip(centers + width, 0, m)
+        lows[0] = 0
+        highs[-1] = m
+        return lows, highs
+
+    def _similarity_block(self, heard, ref, heard_is_a, ref_is_a, rows, col_lo, col_hi):
+        scores = cdist(heard[rows.start : rows.stop], ref[col_lo:col_hi], scorer=fuzz.ratio, dtype=np.float64)
+        bonus = heard_is_a[rows.start : rows.stop, None] & ref_is_a[None, col_lo:col_hi]
+        return scores + bonus * self.short_a_bonus
+
+    def align(self, heard_words, ref_words):
+        """
+        Retourne, pour chaque mot entendu, un tuple (index du mot de référence ou None, similarité).
+        """
+        n, m = len(heard_words), len(ref_words)
+        if n == 0:
+            return []
+        if m == 0:
+            return [(None, 0.0)] * n
+
+        heard = [default_process(w) for w in heard_words]
+        ref = [default_process(w) for w in ref_words]
+        heard_is_a = np.array([w in SHORT_A for w in heard])
+        ref_is_a = np.array([w in SHORT_A for w in ref])
+
+        # au moins la pente m / n : deux lignes consécutives de la bande doivent se toucher
+        width = max(self.band, -(-m // n), 1)
+        while True:
+            result, touches_edge = self._align_in_band(heard, ref, heard_is_a, ref_is_a, width)
+            # un chemin qui longe le bord a peut-être été coupé : on recommence avec une bande deux fois plus large
+            if not touches_edge or width >= m:
+                return result
+            width *= 2
+
+    def _align_in_band(self, heard, ref, heard_is_a, ref_is_a, width):
+        n, m = len(heard), len(ref)
+        lows, highs = self._bands(n, m, width)
+        rows_scores = []  # D[i] sur les colonnes [lows[i], highs[i]]
+        rows_pointers = []  # 0 = diagonale, 1 = mot entendu ignoré, 2 = mot de référence sauté
+        rows_sims = []
+
+        first = np.arange(lows[0], highs[0] + 1)
+        rows_scores.append(first * float(self.gap_ref))
+        rows_pointers.append(np.full(len(first), 2, dtype=np.uint8))
+        rows_sims.append(None)
+
+        block = None
+        block_start = block_col_lo = 0
+        for i in range(1, n + 1):
+            if block is None or i - 1 >= block_start + len(block):
+                # similarités pour un bloc de mots entendus, sur l'union de leurs bandes
+                block_start = i - 1
+                block_end = min(n, block_start + self.block_size)
+                block_col_lo = max(int(lows[block_start + 1]) - 1, 0)
+                block_col_hi = max(int(highs[block_end]), block_col_lo + 1)
+                block = self._similarity_block(
+                    heard, ref, heard_is_a, ref_is_a, range(block_start, block_end), block_col_lo, block_col_hi
+                )
+
+            lo, hi = int(lows[i]), int(highs[i])
+            plo, phi = int(lows[i - 1]), int(highs[i - 1])
+            prev = rows_scores[i - 1]
+            cols = np.arange(lo, hi + 1)
+
+            diag = np.full(len(cols), -np.inf)
+            sims = np.zeros(len(cols))
+            valid = (cols - 1 >= plo) & (cols - 1 <= phi) & (cols >= 1)
+            sims[valid] = block[i - 1 - block_start, cols[valid] - 1 - block_col_lo]
+            diag[valid] = prev[cols[valid] - 1 - plo] + sims[valid] - self.match_offset
+
+            up = np.full(len(cols), -np.inf)
+            valid_up = (cols >= plo) & (cols <= phi)
+            up[valid_up] = prev[cols[valid_up] - plo] + self.gap_heard
+
+            best = np.maximum(diag, up)
+            pointers = np.where(diag >= up, 0, 1).astype(np.uint8)
+
+            # sauts dans la référence : D[j] = max(A[j], D[j-1] + gap) via un maximum cumulé
+            steps = np.arange(len(cols)) * float(self.gap_ref)
+            scores = np.maximum.accumulate(best - steps) + steps
+            # best - steps + steps n'est pas exact en flottant : sans marge, une égalité passerait pour un saut
+            pointers[scores > best + 1e-6] = 2
+
+            rows_scores.append(scores)
+            rows_pointers.append(pointers)
+            rows_sims.append(sims)
+
+        result = [(None, 0.0)] * n
+        touches_edge = False
+        i, j = n, m
+        while i > 0:
+            touches_edge = touches_edge or (0 < j == lows[i]) or (j == highs[i] < m)
+            k = j - int(lows[i])
+            pointer = rows_pointers[i][k]
+            if pointer == 0:
+                result[i - 1] = (j - 1, float(rows_sims[i][k]))
+                i, j = i - 1, j - 1
+            elif pointer == 1:
+                i -= 1
+            else:
+                j -= 1
+        touches_edge = touches_edge or (j == highs[0] < m)
+        return result, touches_edge